@@ -1,9 +1,10 @@
-# Copyright (c) 2019-2025 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2019-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
 from django import forms
+from django.conf import settings
 from django.contrib import admin
 from django.db.models import Q
 from django.forms.utils import ErrorList
@@ -16,12 +17,13 @@ from social_django.models import UserSocialAuth
 
 from tcms_github_app import utils
 from tcms_github_app.models import AppInstallation
+from tcms_github_app.models import ResyncJob
 from tcms_github_app.models import WebhookPayload
 
 
 class WebhookPayloadAdmin(admin.ModelAdmin):
-    search_fields = ('action', 'event', 'sender')
-    list_display = ('pk', 'received_on', 'sender', 'event', 'action')
+    search_fields = ('action', 'event', 'sender', 'delivery')
+    list_display = ('pk', 'received_on', 'sender', 'event', 'action', 'status')
     ordering = ['-pk']
 
     @admin.options.csrf_protect_m
@@ -155,9 +157,22 @@ class AppInstallationAdmin(admin.ModelAdmin):
     def save_form(self, request, form, change):
         app_inst = super().save_form(request, form, change)
         if form.has_changed() and app_inst.tenant_pk:
-            utils.resync(request, app_inst)
+            # records on the new tenant may be missing, start from scratch
+            app_inst.last_synced_on = None
+
+            if getattr(settings, 'KIWI_GITHUB_APP_ASYNC_RESYNC', False):
+                utils.enqueue_resync(request, app_inst, full=True)
+            else:
+                utils.resync(request, app_inst, full=True)
         return app_inst
 
 
+class ResyncJobAdmin(WebhookPayloadAdmin):
+    search_fields = ('state',)
+    list_display = ('pk', 'created_on', 'installation', 'tenant_pk', 'state',
+                    'started_on', 'finished_on')
+
+
 admin.site.register(WebhookPayload, WebhookPayloadAdmin)
+admin.site.register(ResyncJob, ResyncJobAdmin)
 admin.site.register(AppInstallation, AppInstallationAdmin)
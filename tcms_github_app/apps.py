@@ -0,0 +1,16 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+from django.apps import AppConfig
+
+
+class GitHubAppConfig(AppConfig):
+    name = 'tcms_github_app'
+    verbose_name = 'GitHub App integration'
+
+    def ready(self):
+        from tcms_github_app import signals  # pylint: disable=import-outside-toplevel
+
+        signals.connect()
@@ -0,0 +1,89 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import threading
+import time
+
+import github
+import jwt
+from cryptography.hazmat.primitives import serialization
+from django.conf import settings
+
+
+# GitHub rejects app JWTs which expire more than 10 minutes in the future,
+# leave some room for clock drift
+JWT_EXPIRY = 540
+# refresh the JWT this many seconds before it expires
+JWT_LEEWAY = 60
+# backdated to allow for clock drift, same as PyGithub
+JWT_ISSUED_AT = -60
+
+_INTEGRATION = None
+_INTEGRATION_LOCK = threading.Lock()
+
+
+class CachedAppAuth(github.Auth.AppAuth):
+    """
+        Signs the app JWT once and reuses it for most of its lifetime.
+        The private key is parsed only once, when the object is created!
+    """
+    def __init__(self, app_id, private_key):
+        super().__init__(app_id, private_key, jwt_expiry=JWT_EXPIRY)
+        self._signing_key = serialization.load_pem_private_key(
+            private_key.encode(), password=None,
+        )
+        self._lock = threading.Lock()
+        self._jwt = None
+        self._jwt_expires_at = 0
+
+    def create_jwt(self, expiration=None):
+        if expiration is not None:
+            return self._sign(expiration)[0]
+
+        with self._lock:
+            if self._jwt is None or time.time() >= self._jwt_expires_at - JWT_LEEWAY:
+                self._jwt, self._jwt_expires_at = self._sign(JWT_EXPIRY)
+
+            return self._jwt
+
+    def _sign(self, expiration):
+        now = int(time.time())
+        payload = {
+            "iat": now + JWT_ISSUED_AT,
+            "exp": now + expiration,
+            "iss": self.app_id,
+        }
+        return jwt.encode(payload, key=self._signing_key, algorithm="RS256"), now + expiration
+
+
+class SharedGithubIntegration(github.GithubIntegration):
+    """
+        A single instance is shared between all threads. PyGithub
+        reuses the same HTTP connection for all requests made by one
+        object so requests are serialized!
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def get_access_token(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        with self._lock:
+            return super().get_access_token(*args, **kwargs)
+
+
+def get_integration():
+    """
+        Returns the process-wide github.GithubIntegration object
+    """
+    global _INTEGRATION  # pylint: disable=global-statement
+
+    with _INTEGRATION_LOCK:
+        if _INTEGRATION is None:
+            _INTEGRATION = SharedGithubIntegration(
+                auth=CachedAppAuth(settings.KIWI_GITHUB_APP_ID,
+                                   settings.KIWI_GITHUB_APP_PRIVATE_KEY),
+            )
+
+    return _INTEGRATION
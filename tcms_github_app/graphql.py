@@ -0,0 +1,66 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import json
+
+# GitHub doesn't allow more nodes in a single query
+CHUNK_SIZE = 100
+
+
+def chunks(items, size=CHUNK_SIZE):
+    for index in range(0, len(items), size):
+        yield items[index:index + size]
+
+
+def literal(value):
+    """
+        JSON strings are valid GraphQL string literals
+    """
+    return json.dumps(value)
+
+
+def query(rpc, text):
+    """
+        Execute a GraphQL query using the connection object ``rpc`` and
+        return the ``data`` part of the response. Items which can't be
+        found are returned as None!
+    """
+    _headers, response = rpc.requester.requestJsonAndCheck(
+        "POST", "/graphql", input={"query": text},
+    )
+    return (response or {}).get("data") or {}
+
+
+def fetch_repositories(rpc, full_names):
+    """
+        Returns a dict with the information needed to create Product &
+        BugSystem records, in the same format as webhook payloads, for
+        every repository which could be found. Repositories are fetched
+        up to 100 in a single query!
+    """
+    result = {}
+
+    for chunk in chunks(full_names):
+        parts = []
+        for index, full_name in enumerate(chunk):
+            owner, name = full_name.split('/', 1)
+            parts.append(
+                f"r{index}: repository(owner: {literal(owner)}, name: {literal(name)}) "
+                "{ nameWithOwner isFork description url }"
+            )
+
+        data = query(rpc, "query { " + " ".join(parts) + " }")
+
+        for index, full_name in enumerate(chunk):
+            repository = data.get(f"r{index}")
+            if repository:
+                result[full_name] = {
+                    'full_name': repository['nameWithOwner'],
+                    'fork': repository['isFork'],
+                    'description': repository['description'],
+                    'html_url': repository['url'],
+                }
+
+    return result
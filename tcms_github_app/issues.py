@@ -1,14 +1,21 @@
-# Copyright (c) 2020-2024 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2020-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
-import github
+import time
+
 from django.conf import settings
+from django.core.cache import cache
 
 from tcms.issuetracker.types import GitHub
 
 from tcms_github_app import utils
+from tcms_github_app.models import IssueMirror
+
+
+# ETags of issues are kept for revalidation for a week
+ISSUE_ETAG_TIMEOUT = 7 * 24 * 3600
 
 
 class Integration(GitHub):
@@ -25,22 +32,84 @@ class Integration(GitHub):
 
             The ``api_password`` field is determined at runtime!
     """
-    def _rpc_connection(self):
-        installations = utils.find_installations(self.request)
+    def _installation(self):
+        # cached, see utils.find_installation()
+        app_inst = utils.find_installation(self.request)
 
-        if installations.count() != 1:
+        if app_inst is None:
             raise RuntimeError(
                 f'Cannot find GitHub App installation for tenant "{self.request.tenant.name}"')
 
-        installation = installations.first()
+        return app_inst
+
+    def _cache_key(self, repository, number):
+        # private repositories may be installed for more than one tenant
+        return f"issue-details-{self._installation().installation}-{repository}-{number}"
 
-        gh_app = github.GithubIntegration(
-            auth=github.Auth.AppAuth(settings.KIWI_GITHUB_APP_ID,
-                                     settings.KIWI_GITHUB_APP_PRIVATE_KEY),
+    def _rpc_connection(self):
+        # reused between requests, see utils.github_rpc_from_inst()
+        return utils.github_rpc_from_inst(self._installation())
+
+    def details(self, url):
+        """
+            Issues received via webhooks are taken from IssueMirror. Otherwise
+            issue details are cached for KIWI_GITHUB_APP_ISSUE_CACHE_TIMEOUT
+            seconds and revalidated with a conditional request afterwards.
+            GitHub doesn't count 304 Not Modified against the rate limit!
+        """
+        repo_id = self.repo_id
+        number = self.bug_id_from_url(url)
+
+        # kept up to date by webhooks
+        mirror = IssueMirror.objects.filter(
+            tenant_pk=self.request.tenant.pk,
+            repository=repo_id,
+            number=number,
+        ).first()
+        if mirror:
+            return {
+                "title": mirror.title,
+                "description": mirror.body,
+            }
+
+        cache_key = self._cache_key(repo_id, number)
+
+        cached = cache.get(cache_key)
+        if cached and time.time() - cached['fetched_at'] < getattr(
+                settings, 'KIWI_GITHUB_APP_ISSUE_CACHE_TIMEOUT', 300):
+            return cached['details']
+
+        headers = {}
+        if cached:
+            headers['If-None-Match'] = cached['etag']
+
+        response_headers, data = utils.call_github(
+            self._installation(),
+            self.rpc.requester.requestJsonAndCheck,
+            "GET", f"/repos/{repo_id}/issues/{number}", headers=headers,
         )
 
-        token = utils.find_token_from_app_inst(gh_app, installation)
-        return github.Github(auth=github.Auth.Token(token))
+        # body is empty only for 304 Not Modified
+        if data is None and cached:
+            result = cached['details']
+        else:
+            result = {
+                "title": data["title"],
+                "description": data["body"],
+            }
+
+        if response_headers.get('etag'):
+            cache.set(
+                cache_key,
+                {'etag': response_headers['etag'], 'details': result, 'fetched_at': time.time()},
+                ISSUE_ETAG_TIMEOUT,
+            )
+
+        return result
+
+    def report_issue_from_testexecution(self, execution, user):
+        return utils.call_github(
+            self._installation(), super().report_issue_from_testexecution, execution, user)
 
     def is_adding_testcase_to_issue_disabled(self):
         """
@@ -0,0 +1,15 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+from tcms_github_app import worker
+from tcms_github_app.management.commands import process_github_webhooks
+
+
+class Command(process_github_webhooks.Command):
+    help = (
+        "Execute resync jobs which were scheduled by the web application "
+        "while KIWI_GITHUB_APP_ASYNC_RESYNC = True"
+    )
+    process = staticmethod(worker.process_next_resync_job)
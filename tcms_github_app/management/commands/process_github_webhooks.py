@@ -0,0 +1,50 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from tcms_github_app import worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Process GitHub webhooks which were persisted by the web application "
+        "while KIWI_GITHUB_APP_ASYNC_WEBHOOKS = True"
+    )
+    process = staticmethod(worker.process_next_payload)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of worker threads. Default: 4',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Seconds to wait before polling an empty queue again. Default: 1.0',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when the queue is empty instead of waiting for more work',
+        )
+
+    def handle(self, *args, **kwargs):
+        stop_event = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=kwargs['workers']) as executor:
+            futures = [
+                executor.submit(worker.run, stop_event, self.process,
+                                kwargs['sleep'], kwargs['once'])
+                for _ in range(kwargs['workers'])
+            ]
+
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping workers ...")
+                stop_event.set()
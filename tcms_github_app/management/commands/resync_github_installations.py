@@ -0,0 +1,80 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tcms_github_app import worker
+from tcms_github_app.models import AppInstallation
+
+
+class Command(BaseCommand):
+    help = (
+        "Resync all GitHub App installations which are configured to use a tenant. "
+        "Installations for the same tenant are processed one after another, "
+        "different tenants are processed in parallel"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Number of worker processes. 1 means no child processes. '
+                 'Default: number of CPUs',
+        )
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Process all repositories, not only the ones which changed '
+                 'since the last resync',
+        )
+
+    @staticmethod
+    def group_by_tenant():
+        tenants = defaultdict(list)
+
+        for pk, tenant_pk in AppInstallation.objects.filter(
+                tenant_pk__isnull=False).order_by('tenant_pk', 'pk').values_list('pk', 'tenant_pk'):
+            tenants[tenant_pk].append(pk)
+
+        return tenants
+
+    def handle(self, *args, **kwargs):
+        tenants = self.group_by_tenant()
+
+        if kwargs['processes'] <= 1:
+            for tenant_pk, installation_pks in tenants.items():
+                self.report(worker.resync_tenant(tenant_pk, installation_pks, kwargs['full']))
+            return
+
+        # DB connections must not be shared with the child processes
+        connections.close_all()
+
+        with ProcessPoolExecutor(max_workers=kwargs['processes'],
+                                 initializer=django.setup) as executor:
+            futures = [
+                executor.submit(worker.resync_tenant, tenant_pk, installation_pks, kwargs['full'])
+                for tenant_pk, installation_pks in tenants.items()
+            ]
+
+            for future in as_completed(futures):
+                self.report(future.result())
+
+    def report(self, results):
+        for result in results:
+            api_calls = result['api_calls']
+            self.stdout.write(
+                f"installation={result['installation']} tenant={result['tenant_pk']} "
+                f"job={result['job']} state={result['state']} "
+                f"seconds={result['seconds']:.2f} "
+                f"api_calls={'unknown' if api_calls is None else api_calls} "
+                f"counters={result['counters']}"
+            )
+            if result['error']:
+                self.stderr.write(result['error'])
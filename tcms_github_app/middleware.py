@@ -1,11 +1,13 @@
-# Copyright (c) 2019-2024 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2019-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
 # pylint: disable=too-few-public-methods
 
+from django.conf import settings
 from django.contrib import messages
+from django.core.cache import cache
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
@@ -13,6 +15,45 @@ from django.utils.translation import gettext_lazy as _
 from tcms_github_app.models import AppInstallation
 
 
+# for how long to remember the unconfigured installation of a user
+CACHE_TIMEOUT = 3600
+
+
+def _cache_key(user_pk):
+    return f"unconfigured-installation-for-user-{user_pk}"
+
+
+def invalidate_unconfigured_installation(user_pk):
+    """
+        Forget the cached answer for this user, e.g. when an
+        AppInstallation was created or configured
+    """
+    cache.delete(_cache_key(user_pk))
+
+
+def find_unconfigured_installation(user):
+    """
+        Returns (pk, installation) for the first unconfigured AppInstallation
+        performed by this user or None. The answer is cached!
+    """
+    cache_key = _cache_key(user.pk)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached or None
+
+    app_inst = None
+    social_user = user.social_auth.filter(provider='github-app').first()
+    if social_user:
+        app_inst = AppInstallation.objects.filter(
+            sender=social_user.uid,
+            tenant_pk=None
+        ).values_list('pk', 'installation').first()
+
+    # empty tuple means nothing was found
+    cache.set(cache_key, app_inst or (), CACHE_TIMEOUT)
+    return app_inst
+
+
 class CheckGitHubAppMiddleware:
     """
         Warns the user and redirects them to configure their GitHub App
@@ -20,31 +61,45 @@ class CheckGitHubAppMiddleware:
     """
     def __init__(self, get_response):
         self.get_response = get_response
+        self._skipped_paths = None
+
+    @property
+    def skipped_paths(self):
+        """
+            Paths which never need a redirect. Resolved on first use
+            b/c URLs aren't loaded when middleware is initialized!
+        """
+        if self._skipped_paths is None:
+            self._skipped_paths = tuple(path for path in (
+                settings.STATIC_URL,
+                '/json-rpc/',
+                '/xml-rpc/',
+                reverse('github_app_webhook'),
+            ) if path)
+        return self._skipped_paths
 
     def __call__(self, request):
         if not request.user.is_authenticated or request.method != "GET":
             return self.get_response(request)
 
+        if request.path.startswith(self.skipped_paths):
+            return self.get_response(request)
+
         tenant = getattr(request, "tenant")
         if not tenant or tenant.owner != request.user:
             return self.get_response(request)
 
-        app_inst = None
-        social_user = request.user.social_auth.filter(provider='github-app').first()
-        if social_user:
-            app_inst = AppInstallation.objects.filter(
-                sender=social_user.uid,
-                tenant_pk=None
-            ).first()
+        app_inst = find_unconfigured_installation(request.user)
 
         if app_inst:
+            app_inst_pk, installation = app_inst
             admin_path = reverse('admin:tcms_github_app_appinstallation_change',
-                                 args=[app_inst.pk])
+                                 args=[app_inst_pk])
             if request.path != admin_path:
                 messages.add_message(
                     request,
                     messages.WARNING,
-                    _('Unconfigured GitHub App %d') % app_inst.installation,
+                    _('Unconfigured GitHub App %d') % installation,
                     fail_silently=True)
                 return HttpResponseRedirect(admin_path)
 
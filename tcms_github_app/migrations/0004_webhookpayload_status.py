@@ -0,0 +1,33 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+# pylint: disable=invalid-name
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tcms_github_app', '0003_models_jsonfield'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookpayload',
+            name='status',
+            field=models.CharField(
+                choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')],
+                db_index=True,
+                default='done',
+                max_length=16,
+            ),
+        ),
+        migrations.AddField(
+            model_name='webhookpayload',
+            name='processed_on',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+# pylint: disable=invalid-name
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tcms_github_app', '0004_webhookpayload_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookpayload',
+            name='delivery',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
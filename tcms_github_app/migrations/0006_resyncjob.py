@@ -0,0 +1,44 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+# pylint: disable=invalid-name, avoid-auto-field
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tcms_github_app', '0005_webhookpayload_delivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResyncJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True,
+                                        primary_key=True,
+                                        serialize=False,
+                                        verbose_name='ID')),
+                ('tenant_pk', models.PositiveIntegerField(db_index=True)),
+                ('requested_by', models.PositiveIntegerField(blank=True, null=True)),
+                ('state', models.CharField(
+                    choices=[('pending', 'Pending'), ('running', 'Running'),
+                             ('done', 'Done'), ('failed', 'Failed')],
+                    db_index=True,
+                    default='pending',
+                    max_length=16)),
+                ('counters', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('created_on', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('started_on', models.DateTimeField(blank=True, null=True)),
+                ('finished_on', models.DateTimeField(blank=True, null=True)),
+                ('installation', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    to='tcms_github_app.appinstallation')),
+            ],
+        ),
+    ]
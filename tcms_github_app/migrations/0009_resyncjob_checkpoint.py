@@ -0,0 +1,28 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+# pylint: disable=invalid-name
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tcms_github_app', '0008_resyncjob_report'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resyncjob',
+            name='page',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='resyncjob',
+            name='checkpoint_on',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
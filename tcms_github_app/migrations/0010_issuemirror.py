@@ -0,0 +1,40 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+# pylint: disable=invalid-name, avoid-auto-field
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tcms_github_app', '0009_resyncjob_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueMirror',
+            fields=[
+                ('id', models.AutoField(auto_created=True,
+                                        primary_key=True,
+                                        serialize=False,
+                                        verbose_name='ID')),
+                ('tenant_pk', models.PositiveIntegerField(db_index=True)),
+                ('repository', models.CharField(max_length=255)),
+                ('number', models.PositiveIntegerField()),
+                ('title', models.TextField()),
+                ('body', models.TextField(blank=True)),
+                ('state', models.CharField(max_length=16)),
+                ('labels', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='issuemirror',
+            constraint=models.UniqueConstraint(fields=('tenant_pk', 'repository', 'number'),
+                                               name='tcms_github_app_unique_issue'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-# Copyright (c) 2019-2021 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2019-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
@@ -11,6 +11,15 @@ class WebhookPayload(models.Model):
     """
         Holds information about received webhooks
     """
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
     event = models.CharField(max_length=64, db_index=True)
     action = models.CharField(max_length=64, db_index=True, null=True, blank=True)
     # GitHub UID, match with UserSocialAuth.uid
@@ -19,6 +28,15 @@ class WebhookPayload(models.Model):
     # this is for internal purposes
     received_on = models.DateTimeField(db_index=True, auto_now_add=True)
     payload = models.JSONField()
+    # X-GitHub-Delivery header, used to detect redeliveries
+    delivery = models.CharField(max_length=64, unique=True, null=True, blank=True)
+
+    # processing state, see the process_github_webhooks command
+    status = models.CharField(max_length=16, db_index=True,
+                              choices=STATUS_CHOICES, default=STATUS_DONE)
+    processed_on = models.DateTimeField(null=True, blank=True)
+    # deferred until the rate limit is reset, see ratelimit.py
+    not_before = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         indexes = [
@@ -48,6 +66,99 @@ class AppInstallation(models.Model):
     # None - means unconfigured tenant, otherwise has value
     tenant_pk = models.PositiveIntegerField(null=True, blank=True, db_index=True)
     settings_url = models.URLField(null=True, blank=True)
+    # start time of the last successful resync, see utils.resync()
+    last_synced_on = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"GitHub App {self.installation}"
+
+
+class ResyncJob(models.Model):
+    """
+        Resync between GitHub and Kiwi TCMS executed in the background
+        by the process_github_resync_jobs command.
+    """
+    STATE_PENDING = 'pending'
+    STATE_RUNNING = 'running'
+    STATE_DONE = 'done'
+    STATE_FAILED = 'failed'
+    STATE_CHOICES = (
+        (STATE_PENDING, 'Pending'),
+        (STATE_RUNNING, 'Running'),
+        (STATE_DONE, 'Done'),
+        (STATE_FAILED, 'Failed'),
+    )
+
+    installation = models.ForeignKey(AppInstallation, on_delete=models.CASCADE)
+    # records are created on this tenant
+    tenant_pk = models.PositiveIntegerField(db_index=True)
+    # User.pk of the person who requested this resync
+    requested_by = models.PositiveIntegerField(null=True, blank=True)
+    # ignore AppInstallation.last_synced_on and process all repositories
+    full = models.BooleanField(default=False)
+
+    state = models.CharField(max_length=16, db_index=True,
+                             choices=STATE_CHOICES, default=STATE_PENDING)
+    # number of created/existing/skipped records for each record type
+    counters = models.JSONField(default=dict, blank=True)
+    # names of created/existing/skipped records for each record type
+    report = models.JSONField(default=dict, blank=True)
+    # next page of repositories to process, used to resume interrupted jobs
+    page = models.PositiveIntegerField(default=0)
+    checkpoint_on = models.DateTimeField(null=True, blank=True)
+    # deferred until the rate limit is reset, see ratelimit.py
+    not_before = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_on = models.DateTimeField(db_index=True, auto_now_add=True)
+    started_on = models.DateTimeField(null=True, blank=True)
+    finished_on = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Resync {self.pk} for {self.installation}"
+
+    @property
+    def is_finished(self):
+        return self.state in (self.STATE_DONE, self.STATE_FAILED)
+
+    @property
+    def report_details(self):
+        """
+            Returns a list of (record_type, [(status, count, names)]).
+            ``names`` may be shorter than ``count``, see utils.merge_reports()!
+        """
+        return [
+            (record_type, [
+                (status, self.counters.get(record_type, {}).get(status, len(names)), names)
+                for status, names in statuses.items()
+            ])
+            for record_type, statuses in self.report.items()
+        ]
+
+
+class IssueMirror(models.Model):
+    """
+        Copy of a GitHub issue, kept up to date by ``issues`` webhooks.
+        Used by tcms_github_app.issues.Integration before asking GitHub!
+    """
+    # the tenant on which this issue is visible
+    tenant_pk = models.PositiveIntegerField(db_index=True)
+    # lower case, the same as Integration.repo_id
+    repository = models.CharField(max_length=255)
+    number = models.PositiveIntegerField()
+
+    title = models.TextField()
+    body = models.TextField(blank=True)
+    state = models.CharField(max_length=16)
+    labels = models.JSONField(default=list, blank=True)
+    # the value of updated_at on GitHub, used to ignore out of order webhooks
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant_pk', 'repository', 'number'],
+                                    name='tcms_github_app_unique_issue'),
+        ]
+
+    def __str__(self):
+        return f"{self.repository}#{self.number}"
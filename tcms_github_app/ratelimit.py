@@ -0,0 +1,108 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import contextlib
+import contextvars
+import time
+from datetime import datetime
+from datetime import timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# True while executing background work, see background()
+_BACKGROUND = contextvars.ContextVar('tcms_github_app_background', default=False)
+
+
+class RateLimitDeferred(Exception):
+    """
+        Raised instead of making a request on behalf of background work
+        when the remaining rate limit is reserved for interactive operations!
+    """
+    def __init__(self, installation_id, reset):
+        super().__init__(
+            f"Rate limit for GitHub App {installation_id} is reserved until {reset}"
+        )
+        self.installation_id = installation_id
+        self.reset = reset
+
+    @property
+    def not_before(self):
+        return datetime.fromtimestamp(self.reset, tz=timezone.utc)
+
+
+def _cache_key(installation_id):
+    return f"rate-limit-for-{installation_id}"
+
+
+def reserve():
+    """
+        Number of requests reserved for interactive operations
+    """
+    return getattr(settings, 'KIWI_GITHUB_APP_RATELIMIT_RESERVE', 100)
+
+
+def record(installation_id, requester):
+    """
+        Remember the rate limit reported in the last response received by
+        ``requester``. GitHub counts requests per installation so all
+        connection objects for the same installation report the same numbers!
+    """
+    remaining, limit = requester.rate_limiting
+    reset = requester.rate_limiting_resettime
+
+    # unknown until the first response
+    if remaining < 0 or not reset:
+        return
+
+    cache.set(
+        _cache_key(installation_id),
+        {'remaining': remaining, 'limit': limit, 'reset': reset},
+        max(int(reset - time.time()), 1),
+    )
+
+
+def status(installation_id):
+    """
+        Returns a dict with the last known rate limit or None if unknown
+    """
+    current = cache.get(_cache_key(installation_id))
+
+    if current and current['reset'] <= time.time():
+        return None
+
+    return current
+
+
+def is_background():
+    return _BACKGROUND.get()
+
+
+@contextlib.contextmanager
+def background():
+    """
+        Requests made inside this block are made on behalf of background work,
+        e.g. resync or webhooks processed by a worker. They are deferred when
+        the remaining rate limit drops below the reserve!
+    """
+    token = _BACKGROUND.set(True)
+    try:
+        yield
+    finally:
+        _BACKGROUND.reset(token)
+
+
+def check(installation_id):
+    """
+        Called before every request. Raises RateLimitDeferred for
+        background work once the rate limit drops below the reserve!
+    """
+    if not is_background():
+        return
+
+    current = status(installation_id)
+    if current and current['remaining'] < reserve():
+        raise RateLimitDeferred(installation_id, current['reset'])
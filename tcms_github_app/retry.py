@@ -0,0 +1,162 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import time
+
+import github
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from tcms_github_app import ratelimit
+
+
+def _paused(installation_id, reset):
+    return f"Requests for GitHub App {installation_id} are paused until {reset} " \
+        "after repeated failures"
+
+
+class CircuitOpen(Exception):
+    """
+        Raised instead of making a request after repeated failures
+        for the same installation, until the cooldown expires!
+    """
+    def __init__(self, installation_id, reset):
+        super().__init__(_paused(installation_id, reset))
+        self.installation_id = installation_id
+        self.reset = reset
+
+
+class CircuitOpenDeferred(ratelimit.RateLimitDeferred):
+    """
+        Raised instead of CircuitOpen for background work which is
+        deferred until the cooldown expires!
+    """
+    def __init__(self, installation_id, reset):
+        super().__init__(installation_id, reset)
+        self.args = (_paused(installation_id, reset),)
+
+
+def attempts():
+    return getattr(settings, 'KIWI_GITHUB_APP_RETRY_ATTEMPTS', 3)
+
+
+def max_delay():
+    return getattr(settings, 'KIWI_GITHUB_APP_RETRY_MAX_DELAY', 60)
+
+
+def threshold():
+    return getattr(settings, 'KIWI_GITHUB_APP_CIRCUIT_THRESHOLD', 5)
+
+
+def cooldown():
+    return getattr(settings, 'KIWI_GITHUB_APP_CIRCUIT_COOLDOWN', 60)
+
+
+def github_retry():
+    """
+        Retry policy for every request: 5xx responses and rate limited 403s
+        are retried with jittered exponential backoff, honouring Retry-After.
+        Waits longer than KIWI_GITHUB_APP_RETRY_MAX_DELAY raise
+        RateLimitExceededExceedsMaxWait instead of blocking!
+    """
+    return github.GithubRetry(
+        total=attempts(),
+        backoff_factor=1,
+        backoff_jitter=1,
+        backoff_max=max_delay(),
+        max_rate_limit_wait=max_delay(),
+    )
+
+
+def _headers(err):
+    return {key.lower(): value for key, value in (getattr(err, 'headers', None) or {}).items()}
+
+
+def is_transient(err):
+    """
+        True when GitHub is having trouble, as opposed to rejecting the request
+    """
+    if isinstance(err, (requests.exceptions.ConnectionError,
+                        requests.exceptions.RetryError,
+                        requests.exceptions.Timeout,
+                        github.RateLimitExceededException)):
+        return True
+
+    if isinstance(err, github.GithubException):
+        return err.status >= 500 or (err.status == 403 and 'retry-after' in _headers(err))
+
+    return False
+
+
+def retry_at(err):
+    """
+        Returns the timestamp after which the failed request may be retried
+    """
+    now = time.time()
+    headers = _headers(err)
+
+    retry_after = headers.get('retry-after', '')
+    if retry_after.isdigit():
+        return now + int(retry_after)
+
+    reset = headers.get('x-ratelimit-reset', '')
+    if headers.get('x-ratelimit-remaining') == '0' and reset.isdigit():
+        return int(reset) + 1
+
+    if getattr(err, 'wait', None):
+        return now + err.wait
+
+    return now + cooldown()
+
+
+def _failures_key(installation_id):
+    return f"circuit-failures-for-{installation_id}"
+
+
+def _open_key(installation_id):
+    return f"circuit-open-for-{installation_id}"
+
+
+def check(installation_id):
+    """
+        Called before every request. Raises CircuitOpen while
+        requests for this installation are paused. Background work
+        is deferred instead, see CircuitOpenDeferred!
+    """
+    until = cache.get(_open_key(installation_id))
+    if not until or until <= time.time():
+        return
+
+    if ratelimit.is_background():
+        raise CircuitOpenDeferred(installation_id, until)
+
+    raise CircuitOpen(installation_id, until)
+
+
+def failure(installation_id):
+    """
+        Record a transient failure. Pauses requests for this installation
+        once KIWI_GITHUB_APP_CIRCUIT_THRESHOLD failures happen in a row!
+    """
+    cache_key = _failures_key(installation_id)
+    cache.add(cache_key, 0, cooldown() * 2)
+    try:
+        failures = cache.incr(cache_key)
+    except ValueError:
+        # expired in the meantime
+        failures = 1
+        cache.set(cache_key, failures, cooldown() * 2)
+
+    if failures < threshold():
+        return
+
+    cache.set(_open_key(installation_id), time.time() + cooldown(), cooldown())
+    # a single failure after the cooldown pauses requests again
+    cache.set(cache_key, threshold() - 1, cooldown() * 2)
+
+
+def success(installation_id):
+    cache.delete(_failures_key(installation_id))
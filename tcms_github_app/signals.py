@@ -0,0 +1,50 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+
+from social_django.models import UserSocialAuth
+
+from tcms_tenants.models import Tenant
+
+from tcms_github_app import middleware
+from tcms_github_app import utils
+from tcms_github_app.models import AppInstallation
+
+
+def handle_installation_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    utils.invalidate_tenant(instance.installation)
+    utils.invalidate_installations()
+
+    for user_pk in UserSocialAuth.objects.filter(
+            provider='github-app', uid=str(instance.sender)).values_list('user_id', flat=True):
+        middleware.invalidate_unconfigured_installation(user_pk)
+
+
+def handle_social_auth_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    middleware.invalidate_unconfigured_installation(instance.user_id)
+    utils.invalidate_installations()
+
+
+def handle_tenant_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    for installation_id in AppInstallation.objects.filter(
+            tenant_pk=instance.pk).values_list('installation', flat=True):
+        utils.invalidate_tenant(installation_id)
+
+
+def connect():
+    post_save.connect(handle_installation_changed, sender=AppInstallation,
+                      dispatch_uid='tcms_github_app.installation_saved')
+    post_delete.connect(handle_installation_changed, sender=AppInstallation,
+                        dispatch_uid='tcms_github_app.installation_deleted')
+    post_save.connect(handle_social_auth_changed, sender=UserSocialAuth,
+                      dispatch_uid='tcms_github_app.social_auth_saved')
+    post_delete.connect(handle_social_auth_changed, sender=UserSocialAuth,
+                        dispatch_uid='tcms_github_app.social_auth_deleted')
+    post_save.connect(handle_tenant_changed, sender=Tenant,
+                      dispatch_uid='tcms_github_app.tenant_saved')
+    post_delete.connect(handle_tenant_changed, sender=Tenant,
+                        dispatch_uid='tcms_github_app.tenant_deleted')
@@ -1,11 +1,14 @@
-# Copyright (c) 2019-2021 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2019-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
 # pylint: disable=too-many-ancestors
 
+import unittest.mock
+
 import factory
+import github
 from factory.django import DjangoModelFactory
 
 from tcms_tenants.tests import LoggedInTestCase
@@ -30,6 +33,34 @@ class UserSocialAuthFactory(DjangoModelFactory):
     uid = factory.Sequence(lambda n: n)
 
 
+def paginated_list(items, per_page=100):
+    """
+        Stand-in for github.PaginatedList.PaginatedList
+    """
+    result = unittest.mock.MagicMock()
+    result.get_page.side_effect = lambda page: items[page * per_page:(page + 1) * per_page]
+    return result
+
+
+def github_api(repositories, graphql=None):
+    """
+        Stand-in for requester.requestJsonAndCheck(). ``repositories`` is a dict
+        of full_name -> attributes returned for REST requests, GraphQL queries
+        return ``graphql``. Unknown repositories are not found!
+    """
+    def request(verb, url, **_kwargs):
+        if verb == "POST" and url == "/graphql":
+            return {}, graphql or {"data": {}}
+
+        full_name = url.removeprefix("/repos/")
+        if full_name not in repositories:
+            raise github.UnknownObjectException(404, {}, {})
+
+        return {"etag": f'"{full_name}"'}, dict(repositories[full_name], full_name=full_name)
+
+    return request
+
+
 class AnonymousTestCase(LoggedInTestCase):
     def setUp(self):
         super().setUp()
@@ -0,0 +1,37 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import time
+import unittest.mock
+
+import jwt
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from tcms_github_app import auth
+
+
+class CachedAppAuthTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.app_auth = auth.CachedAppAuth(settings.KIWI_GITHUB_APP_ID,
+                                           settings.KIWI_GITHUB_APP_PRIVATE_KEY)
+
+    def test_jwt_is_reused(self):
+        self.assertEqual(self.app_auth.token, self.app_auth.token)
+
+        claims = jwt.decode(self.app_auth.token, options={"verify_signature": False})
+        self.assertEqual(claims["iss"], settings.KIWI_GITHUB_APP_ID)
+        self.assertLessEqual(claims["exp"] - claims["iat"], 600)
+
+    def test_jwt_is_signed_again_before_expiration(self):
+        first_token = self.app_auth.token
+
+        with unittest.mock.patch('tcms_github_app.auth.time.time',
+                                 return_value=time.time() + auth.JWT_EXPIRY):
+            self.assertNotEqual(first_token, self.app_auth.token)
+
+    def test_integration_is_shared(self):
+        self.assertIs(auth.get_integration(), auth.get_integration())
@@ -1,4 +1,4 @@
-# Copyright (c) 2021-2020 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2021-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
@@ -21,6 +21,7 @@ from tcms.tests.factories import ProductFactory
 
 from tcms_github_app.tests import AnonymousTestCase
 from tcms_github_app.tests import AppInstallationFactory
+from tcms_github_app.tests import github_api
 from tcms_github_app.tests import UserSocialAuthFactory
 
 
@@ -33,13 +34,17 @@ class HandleInstallationRepositoriesTestCase(AnonymousTestCase):
 
     @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
     def test_adds_new_data_when_it_doesnt_exist(self, github_rpc):
-        mock_repo = unittest.mock.MagicMock()
-        mock_repo.fork = False
-        mock_repo.full_name = 'kiwitcms-bot/IT-CPE'
-        mock_repo.description = ''
-        mock_repo.html_url = f'https://github.com/{mock_repo.full_name}'
-
-        github_rpc.return_value.get_repo = unittest.mock.MagicMock(side_effect=[mock_repo])
+        # repository information is fetched in a single GraphQL query
+        github_rpc.return_value.requester.requestJsonAndCheck.return_value = ({}, {
+            "data": {
+                "r0": {
+                    "nameWithOwner": "kiwitcms-bot/IT-CPE",
+                    "isFork": False,
+                    "description": None,
+                    "url": "https://github.com/kiwitcms-bot/IT-CPE",
+                },
+            },
+        })
 
         # assert products don't exist initially
         for schema_name in ['public', self.tenant.schema_name]:
@@ -109,15 +114,20 @@ class HandleInstallationRepositoriesTestCase(AnonymousTestCase):
             self.assertEqual(new_bugsystem.tracker_type, 'tcms_github_app.issues.Integration')
             self.assertEqual(new_bugsystem.base_url, 'https://github.com/kiwitcms-bot/IT-CPE')
 
+        # no REST requests after the GraphQL query
+        github_rpc.return_value.requester.requestJsonAndCheck.assert_called_once()
+
     @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
     def test_doesnt_crash_when_data_exists(self, github_rpc):
-        mock_repo = unittest.mock.MagicMock()
-        mock_repo.fork = False
-        mock_repo.full_name = 'kiwitcms-bot/IT'
-        mock_repo.description = ''
-        mock_repo.html_url = f'https://github.com/{mock_repo.full_name}'
-
-        github_rpc.return_value.get_repo = unittest.mock.MagicMock(side_effect=[mock_repo])
+        github_rpc.return_value.requester.rate_limiting = (5000, 5000)
+        # GraphQL didn't return anything, fall back to REST
+        github_rpc.return_value.requester.requestJsonAndCheck.side_effect = github_api({
+            'kiwitcms-bot/IT': {
+                'fork': False,
+                'description': '',
+                'html_url': 'https://github.com/kiwitcms-bot/IT',
+            },
+        })
 
         # make sure Product & BugSystem exist first
         with tenant_context(self.tenant):
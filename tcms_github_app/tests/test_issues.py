@@ -1,4 +1,4 @@
-# Copyright (c) 2023-2024 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2023-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
@@ -8,15 +8,22 @@
 import os
 import time
 import unittest
+import unittest.mock
 
+import github
+from django.core.cache import cache
 from django.http import HttpRequest
+from django.test import override_settings
 from django.utils import timezone
 from parameterized import parameterized
 
 from tcms.testcases.models import BugSystem
 from tcms.tests.factories import ComponentFactory, TestExecutionFactory
 
+from tcms_github_app import utils
 from tcms_github_app.issues import Integration
+from tcms_github_app.models import IssueMirror
+from tcms_github_app.models import WebhookPayload
 from tcms_github_app.tests import AppInstallationFactory, LoggedInTestCase
 
 
@@ -182,3 +189,117 @@ class TestGitHubIntegration(LoggedInTestCase):
 
         # close issue after we're done
         issue.edit(state="closed")
+
+
+class IssueDetailsCacheTestCase(LoggedInTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.app_inst = AppInstallationFactory(sender=1002300, tenant_pk=cls.tenant.pk)
+
+    def setUp(self):
+        super().setUp()
+        bug_system = unittest.mock.MagicMock()
+        bug_system.base_url = "https://github.com/kiwitcms/cached-details"
+        self.tracker = Integration(bug_system, unittest.mock.MagicMock(tenant=self.tenant))
+        self.url = "https://github.com/kiwitcms/cached-details/issues/7"
+        cache.delete(f"issue-details-{self.app_inst.installation}-kiwitcms/cached-details-7")
+
+        patcher = unittest.mock.patch.object(
+            Integration, 'rpc', new_callable=unittest.mock.PropertyMock)
+        self.rpc = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_details_are_cached_then_revalidated(self):
+        self.rpc.requester.requestJsonAndCheck.side_effect = [
+            ({'etag': '"issue-7"'}, {'title': 'Cached title', 'body': 'Cached body'}),
+            # 304 Not Modified
+            ({'etag': '"issue-7"'}, None),
+        ]
+        expected = {"title": "Cached title", "description": "Cached body"}
+
+        self.assertEqual(expected, self.tracker.details(self.url))
+        # served from cache without a request
+        self.assertEqual(expected, self.tracker.details(self.url))
+        self.assertEqual(1, self.rpc.requester.requestJsonAndCheck.call_count)
+
+        with override_settings(KIWI_GITHUB_APP_ISSUE_CACHE_TIMEOUT=0):
+            self.assertEqual(expected, self.tracker.details(self.url))
+
+        self.rpc.requester.requestJsonAndCheck.assert_called_with(
+            "GET", "/repos/kiwitcms/cached-details/issues/7",
+            headers={'If-None-Match': '"issue-7"'},
+        )
+
+    def test_cache_isnt_shared_between_installations(self):
+        self.rpc.requester.requestJsonAndCheck.side_effect = [
+            ({'etag': '"issue-7"'}, {'title': 'Private title', 'body': 'Private body'}),
+            github.UnknownObjectException(404, {}, {}),
+        ]
+
+        self.tracker.details(self.url)
+
+        other = AppInstallationFactory(sender=1002301)
+        with unittest.mock.patch.object(Integration, '_installation', return_value=other):
+            # not visible to this installation, must not be served from cache
+            with self.assertRaises(github.UnknownObjectException):
+                self.tracker.details(self.url)
+
+        self.assertEqual(2, self.rpc.requester.requestJsonAndCheck.call_count)
+        self.rpc.requester.requestJsonAndCheck.assert_called_with(
+            "GET", "/repos/kiwitcms/cached-details/issues/7", headers={},
+        )
+
+
+class IssueMirrorTestCase(LoggedInTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.app_inst = AppInstallationFactory(sender=1002300, tenant_pk=cls.tenant.pk)
+
+    def setUp(self):
+        super().setUp()
+        bug_system = unittest.mock.MagicMock()
+        bug_system.base_url = "https://github.com/kiwitcms/Mirrored"
+        self.tracker = Integration(bug_system, unittest.mock.MagicMock(tenant=self.tenant))
+
+    def webhook(self, action, title, updated_at):
+        return WebhookPayload(
+            event='issues',
+            action=action,
+            sender=1002300,
+            payload={
+                'action': action,
+                'installation': {'id': self.app_inst.installation},
+                'repository': {'full_name': 'kiwitcms/Mirrored'},
+                'issue': {
+                    'number': 3,
+                    'title': title,
+                    'body': None,
+                    'state': 'closed' if action == 'closed' else 'open',
+                    'labels': [{'name': 'bug'}],
+                    'updated_at': updated_at,
+                },
+            },
+        )
+
+    @unittest.mock.patch.object(Integration, 'rpc', new_callable=unittest.mock.PropertyMock)
+    def test_details_are_taken_from_mirror(self, rpc):
+        utils.mirror_issue(self.webhook('opened', 'Mirrored issue', '2026-01-01T10:00:00Z'))
+        utils.mirror_issue(self.webhook('closed', 'Closed issue', '2026-01-01T12:00:00Z'))
+        # delivered late, ignored
+        utils.mirror_issue(self.webhook('edited', 'Stale title', '2026-01-01T11:00:00Z'))
+
+        mirror = IssueMirror.objects.get(tenant_pk=self.tenant.pk,
+                                         repository='kiwitcms/mirrored', number=3)
+        self.assertEqual(mirror.state, 'closed')
+        self.assertEqual(mirror.labels, ['bug'])
+
+        self.assertEqual(
+            {"title": "Closed issue", "description": ""},
+            self.tracker.details("https://github.com/kiwitcms/Mirrored/issues/3"),
+        )
+        rpc.assert_not_called()
+
+        utils.mirror_issue(self.webhook('deleted', 'Closed issue', '2026-01-01T13:00:00Z'))
+        self.assertFalse(IssueMirror.objects.filter(number=3).exists())
@@ -1,15 +1,18 @@
-# Copyright (c) 2019-2022 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2019-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
 # pylint: disable=too-many-ancestors
 
+from http import HTTPStatus
+
 from django.test import modify_settings
 from django.urls import reverse
 
 from tcms_tenants.tests import LoggedInTestCase
 
+from tcms_github_app import middleware
 from tcms_github_app.tests import AppInstallationFactory
 from tcms_github_app.tests import UserSocialAuthFactory
 
@@ -95,3 +98,49 @@ class CheckGitHubAppMiddlewareTestCase(LoggedInTestCase):
         response = self.client.get('/', follow=True)
 
         self.assertContains(response, 'Dashboard')
+
+    @modify_settings(MIDDLEWARE={
+        'append': 'tcms_github_app.middleware.CheckGitHubAppMiddleware',
+    })
+    def test_stops_redirecting_after_installation_is_configured(self):
+        self.client.logout()
+        self.client.login(
+            username=self.tenant.owner.username,
+            password='password',
+        )
+
+        social_user = UserSocialAuthFactory(user=self.tenant.owner)
+        app_inst = AppInstallationFactory(sender=int(social_user.uid))
+        expected_url = reverse('admin:tcms_github_app_appinstallation_change',
+                               args=[app_inst.pk])
+
+        response = self.client.get('/')
+        self.assertRedirects(response, expected_url, fetch_redirect_response=False)
+
+        # answer is cached
+        self.assertEqual(
+            (app_inst.pk, app_inst.installation),
+            middleware.find_unconfigured_installation(self.tenant.owner))
+
+        # cache is invalidated
+        app_inst.tenant_pk = self.tenant.pk
+        app_inst.save()
+
+        response = self.client.get('/')
+        self.assertContains(response, 'Kiwi TCMS - Dashboard')
+
+    @modify_settings(MIDDLEWARE={
+        'append': 'tcms_github_app.middleware.CheckGitHubAppMiddleware',
+    })
+    def test_doesnt_redirect_json_rpc(self):
+        self.client.logout()
+        self.client.login(
+            username=self.tenant.owner.username,
+            password='password',
+        )
+
+        social_user = UserSocialAuthFactory(user=self.tenant.owner)
+        AppInstallationFactory(sender=int(social_user.uid))
+
+        response = self.client.get('/json-rpc/')
+        self.assertNotEqual(response.status_code, HTTPStatus.FOUND)
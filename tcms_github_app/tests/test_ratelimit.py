@@ -0,0 +1,53 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import time
+import unittest.mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.test import override_settings
+
+from tcms_github_app import ratelimit
+
+
+@override_settings(KIWI_GITHUB_APP_RATELIMIT_RESERVE=100)
+class RateLimitTestCase(SimpleTestCase):
+    installation_id = 24680
+
+    def setUp(self):
+        super().setUp()
+        cache.delete(f"rate-limit-for-{self.installation_id}")
+
+    def record(self, remaining, reset):
+        requester = unittest.mock.MagicMock()
+        requester.rate_limiting = (remaining, 5000)
+        requester.rate_limiting_resettime = reset
+        ratelimit.record(self.installation_id, requester)
+
+    def test_unknown_before_first_response(self):
+        self.record(-1, 0)
+        self.assertIsNone(ratelimit.status(self.installation_id))
+
+    def test_interactive_requests_use_the_reserve(self):
+        reset = int(time.time()) + 600
+        self.record(50, reset)
+
+        self.assertEqual(ratelimit.status(self.installation_id)['remaining'], 50)
+        # not raised
+        ratelimit.check(self.installation_id)
+
+        with ratelimit.background():
+            with self.assertRaises(ratelimit.RateLimitDeferred) as context:
+                ratelimit.check(self.installation_id)
+
+        self.assertEqual(context.exception.not_before.timestamp(), reset)
+        self.assertFalse(ratelimit.is_background())
+
+    def test_background_requests_above_the_reserve(self):
+        self.record(101, int(time.time()) + 600)
+
+        with ratelimit.background():
+            ratelimit.check(self.installation_id)
@@ -0,0 +1,417 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+# pylint: disable=too-many-ancestors
+
+import time
+import unittest.mock
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from django.urls import reverse
+from django_tenants.utils import tenant_context
+
+from tcms.management.models import Product
+from tcms.management.models import Version
+from tcms.testcases.models import BugSystem
+
+from tcms_tenants.tests import LoggedInTestCase
+
+from tcms_github_app import ratelimit
+from tcms_github_app import utils
+from tcms_github_app import worker
+from tcms_github_app.models import ResyncJob
+from tcms_github_app.tests import AppInstallationFactory
+from tcms_github_app.tests import UserSocialAuthFactory
+from tcms_github_app.tests import paginated_list
+
+
+@override_settings(KIWI_GITHUB_APP_ASYNC_RESYNC=True)
+class BackgroundResyncTestCase(LoggedInTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        social_user = UserSocialAuthFactory(user=cls.tester)
+        cls.app_inst = AppInstallationFactory(
+            sender=social_user.uid,
+            tenant_pk=cls.tenant.pk,
+        )
+
+    def tearDown(self):
+        ResyncJob.objects.all().delete()
+        super().tearDown()
+
+    def test_resync_is_enqueued(self):
+        response = self.client.get(reverse('github_app_resync'))
+
+        job = ResyncJob.objects.get(installation=self.app_inst)
+        self.assertRedirects(response, reverse('github_app_resync_job', args=[job.pk]))
+        self.assertEqual(job.state, ResyncJob.STATE_PENDING)
+        self.assertEqual(job.tenant_pk, self.tenant.pk)
+        self.assertEqual(job.requested_by, self.tester.pk)
+
+        # doesn't schedule another one while the first is still waiting
+        self.client.get(reverse('github_app_resync'))
+        self.assertEqual(1, ResyncJob.objects.filter(installation=self.app_inst).count())
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    @unittest.mock.patch('tcms_github_app.utils.github_installation_from_inst')
+    def test_resync_job_is_executed_by_worker(self, gh_inst, rpc):
+        rpc.return_value.requester.rate_limiting = (5000, 5000)
+        rpc.return_value.requester.requestJsonAndCheck.return_value = (
+            {}, [{'name': 'v1.0'}, {'name': 'v2.0'}],
+        )
+        gh_inst.return_value.get_repos.return_value = paginated_list([
+            utils.RepositoryView({
+                'full_name': 'kiwitcms-bot/background',
+                'fork': False,
+                'description': 'Imported in the background',
+            }, unittest.mock.MagicMock()),
+        ])
+
+        job = utils.enqueue_resync(unittest.mock.MagicMock(user=self.tester), self.app_inst)
+
+        self.assertTrue(worker.process_next_resync_job())
+        self.assertFalse(worker.process_next_resync_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.state, ResyncJob.STATE_DONE)
+        self.assertIsNotNone(job.started_on)
+        self.assertIsNotNone(job.finished_on)
+        self.assertEqual(job.counters['product'], {'created': 1, 'exists': 0, 'skipped': 0})
+        self.assertEqual(job.counters['bug_system'], {'created': 1, 'exists': 0, 'skipped': 0})
+        self.assertEqual(job.counters['version'], {'created': 2, 'exists': 0, 'skipped': 0})
+        self.assertEqual(job.report['version']['created'],
+                         ['kiwitcms-bot/background@v1.0', 'kiwitcms-bot/background@v2.0'])
+
+        with tenant_context(self.tenant):
+            product = Product.objects.get(name='kiwitcms-bot/background')
+            self.assertTrue(Version.objects.filter(product=product, value='v2.0').exists())
+
+        response = self.client.get(reverse('github_app_resync_job_status', args=[job.pk]))
+        self.assertEqual(response.json()['state'], ResyncJob.STATE_DONE)
+
+        response = self.client.get(reverse('github_app_resync_job', args=[job.pk]))
+        self.assertContains(response, f'GitHub resync #{job.pk}')
+
+
+class IncrementalResyncTestCase(LoggedInTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        social_user = UserSocialAuthFactory(user=cls.tester)
+        cls.app_inst = AppInstallationFactory(
+            sender=social_user.uid,
+            tenant_pk=cls.tenant.pk,
+        )
+
+    def job(self, **kwargs):
+        return ResyncJob.objects.create(
+            installation=self.app_inst,
+            tenant_pk=self.tenant.pk,
+            state=ResyncJob.STATE_RUNNING,
+            **kwargs,
+        )
+
+    @staticmethod
+    def repository(full_name, updated_at):
+        repo_object = unittest.mock.MagicMock()
+        repo_object.full_name = full_name
+        repo_object.fork = False
+        repo_object.description = f'Description for {full_name}'
+        repo_object.html_url = f'https://github.com/{full_name}'
+        repo_object.updated_at = updated_at
+        repo_object.pushed_at = None
+        return repo_object
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    @unittest.mock.patch('tcms_github_app.utils.github_installation_from_inst')
+    def test_unchanged_repositories_are_skipped(self, gh_inst, rpc):
+        rpc.return_value.requester.rate_limiting = (5000, 5000)
+        rpc.return_value.requester.requestJsonAndCheck.return_value = ({}, [])
+        watermark = timezone.now() - timedelta(days=1)
+        self.app_inst.last_synced_on = watermark
+        self.app_inst.save()
+
+        with tenant_context(self.tenant):
+            # fully imported before the last resync
+            utils.import_repositories([
+                self.repository('kiwitcms-bot/unchanged', watermark),
+                self.repository('kiwitcms-bot/changed', watermark),
+                self.repository('kiwitcms-bot/unmapped', watermark),
+            ])
+            # removed by hand, should be imported again
+            BugSystem.objects.filter(name='GitHub Issues for kiwitcms-bot/unmapped').delete()
+
+            gh_inst.return_value.get_repos.return_value = paginated_list([
+                self.repository('kiwitcms-bot/unchanged', watermark),
+                self.repository('kiwitcms-bot/changed', timezone.now()),
+                self.repository('kiwitcms-bot/unmapped', watermark),
+                self.repository('kiwitcms-bot/new', watermark),
+            ])
+
+            job = self.job()
+            utils._resync(job)  # pylint: disable=protected-access
+
+        self.assertEqual(job.report['product'], {
+            'created': ['kiwitcms-bot/new'],
+            'exists': ['kiwitcms-bot/changed', 'kiwitcms-bot/unmapped'],
+            'skipped': ['kiwitcms-bot/unchanged'],
+        })
+        self.assertEqual(job.report['bug_system']['created'],
+                         ['GitHub Issues for kiwitcms-bot/new',
+                          'GitHub Issues for kiwitcms-bot/unmapped'])
+
+        self.app_inst.refresh_from_db()
+        self.assertGreater(self.app_inst.last_synced_on, watermark)
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    @unittest.mock.patch('tcms_github_app.utils.github_installation_from_inst')
+    def test_full_resync_ignores_watermark(self, gh_inst, rpc):
+        rpc.return_value.requester.rate_limiting = (5000, 5000)
+        rpc.return_value.requester.requestJsonAndCheck.return_value = ({}, [])
+        watermark = timezone.now()
+        self.app_inst.last_synced_on = watermark
+        self.app_inst.save()
+
+        with tenant_context(self.tenant):
+            utils.import_repositories([
+                self.repository('kiwitcms-bot/full-resync', watermark),
+            ])
+            gh_inst.return_value.get_repos.return_value = paginated_list([
+                self.repository('kiwitcms-bot/full-resync', watermark),
+            ])
+
+            job = self.job(full=True)
+            utils._resync(job)  # pylint: disable=protected-access
+
+        self.assertEqual(job.report['product']['exists'], ['kiwitcms-bot/full-resync'])
+        self.assertEqual(job.report['product']['skipped'], [])
+
+    def reserve_rate_limit(self, rpc):
+        rpc.return_value.requester.rate_limiting = (10, 5000)
+        rpc.return_value.requester.rate_limiting_resettime = int(time.time()) + 600
+        ratelimit.record(self.app_inst.installation, rpc.return_value.requester)
+        self.addCleanup(cache.delete, f"rate-limit-for-{self.app_inst.installation}")
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    @unittest.mock.patch('tcms_github_app.utils.github_installation_from_inst')
+    def test_watermark_stays_when_tags_are_deferred(self, gh_inst, rpc):
+        self.reserve_rate_limit(rpc)
+        watermark = timezone.now() - timedelta(days=1)
+        self.app_inst.last_synced_on = watermark
+        self.app_inst.save()
+
+        with tenant_context(self.tenant):
+            gh_inst.return_value.get_repos.return_value = paginated_list([
+                self.repository('kiwitcms-bot/deferred-tags', timezone.now()),
+            ])
+
+            job = self.job()
+            with ratelimit.background():
+                with self.assertRaises(ratelimit.RateLimitDeferred):
+                    utils._resync(job)  # pylint: disable=protected-access
+
+        # continues from the same page
+        self.assertEqual(job.page, 0)
+        self.app_inst.refresh_from_db()
+        self.assertEqual(self.app_inst.last_synced_on, watermark)
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    @unittest.mock.patch('tcms_github_app.utils.github_installation_from_inst')
+    def test_resync_stops_when_it_cant_be_deferred(self, gh_inst, rpc):
+        self.reserve_rate_limit(rpc)
+        watermark = timezone.now() - timedelta(days=1)
+        self.app_inst.last_synced_on = watermark
+        self.app_inst.save()
+
+        gh_inst.return_value.get_repos.return_value = paginated_list([
+            self.repository('kiwitcms-bot/stopped-tags', timezone.now()),
+        ])
+
+        job = self.job()
+        utils.run_resync_job(job)
+
+        self.assertEqual(job.state, ResyncJob.STATE_DONE)
+        self.assertIn('Tags were not imported for all repositories', job.error)
+        rpc.return_value.requester.requestJsonAndCheck.assert_not_called()
+
+        self.app_inst.refresh_from_db()
+        self.assertEqual(self.app_inst.last_synced_on, watermark)
+
+        response = self.client.get(reverse('github_app_resync_job', args=[job.pk]))
+        self.assertContains(response, 'Tags were not imported for all repositories')
+
+
+class ResyncSummaryTestCase(LoggedInTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        social_user = UserSocialAuthFactory(user=cls.tester)
+        cls.app_inst = AppInstallationFactory(
+            sender=social_user.uid,
+            tenant_pk=cls.tenant.pk,
+        )
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    @unittest.mock.patch('tcms_github_app.utils.github_installation_from_inst')
+    def test_summary_doesnt_depend_on_number_of_repositories(self, gh_inst, rpc):
+        rpc.return_value.requester.rate_limiting = (5000, 5000)
+        rpc.return_value.requester.requestJsonAndCheck.return_value = ({}, [])
+        gh_inst.return_value.get_repos.return_value = paginated_list([
+            utils.RepositoryView({
+                'full_name': f'kiwitcms-bot/summary-{index}',
+                'fork': index % 5 == 0,
+                'description': '',
+            }, unittest.mock.MagicMock())
+            for index in range(20)
+        ])
+
+        response = self.client.get(reverse('github_app_resync'), follow=True)
+
+        job = ResyncJob.objects.get(installation=self.app_inst)
+        self.assertEqual(job.state, ResyncJob.STATE_DONE)
+        self.assertEqual(job.counters['product'], {'created': 16, 'exists': 0, 'skipped': 4})
+        self.assertIn('kiwitcms-bot/summary-0', job.report['product']['skipped'])
+
+        self.assertContains(response, 'Products: 16 imported from GitHub, 0 already exist, 4 skipped')
+        self.assertContains(response, reverse('github_app_resync_job', args=[job.pk]))
+        self.assertNotContains(response, 'kiwitcms-bot/summary-1 was imported from GitHub')
+
+        response = self.client.get(reverse('github_app_resync_job', args=[job.pk]))
+        self.assertContains(response, 'kiwitcms-bot/summary-19')
+
+    @override_settings(KIWI_GITHUB_APP_RESYNC_REPORT_LIMIT=5)
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    @unittest.mock.patch('tcms_github_app.utils.github_installation_from_inst')
+    def test_report_keeps_a_limited_number_of_names(self, gh_inst, rpc):
+        rpc.return_value.requester.requestJsonAndCheck.return_value = ({}, [])
+        gh_inst.return_value.get_repos.return_value = paginated_list([
+            utils.RepositoryView({
+                'full_name': f'kiwitcms-bot/limited-{index:03}',
+                'fork': False,
+                'description': '',
+            }, unittest.mock.MagicMock())
+            for index in range(150)
+        ])
+
+        self.client.get(reverse('github_app_resync'))
+
+        job = ResyncJob.objects.get(installation=self.app_inst)
+        self.assertEqual(job.counters['product'], {'created': 150, 'exists': 0, 'skipped': 0})
+        self.assertEqual(len(job.report['product']['created']), 5)
+
+        response = self.client.get(reverse('github_app_resync_job', args=[job.pk]))
+        self.assertContains(response, 'created: 150')
+        self.assertContains(response, 'kiwitcms-bot/limited-004')
+        self.assertNotContains(response, 'kiwitcms-bot/limited-005')
+
+
+@override_settings(KIWI_GITHUB_APP_RESYNC_TIMEOUT=60)
+class ResumeResyncTestCase(LoggedInTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        social_user = UserSocialAuthFactory(user=cls.tester)
+        cls.app_inst = AppInstallationFactory(
+            sender=social_user.uid,
+            tenant_pk=cls.tenant.pk,
+        )
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    @unittest.mock.patch('tcms_github_app.utils.github_installation_from_inst')
+    def test_interrupted_job_continues_from_last_page(self, gh_inst, rpc):
+        rpc.return_value.requester.rate_limiting = (5000, 5000)
+        rpc.return_value.requester.requestJsonAndCheck.return_value = ({}, [])
+        gh_inst.return_value.get_repos.return_value = paginated_list([
+            utils.RepositoryView({
+                'full_name': f'kiwitcms-bot/resume-{index:03}',
+                'fork': False,
+                'description': '',
+            }, unittest.mock.MagicMock())
+            for index in range(150)
+        ])
+
+        # the worker which imported the first page was killed
+        job = ResyncJob.objects.create(
+            installation=self.app_inst,
+            tenant_pk=self.tenant.pk,
+            state=ResyncJob.STATE_RUNNING,
+            started_on=timezone.now() - timedelta(hours=1),
+            checkpoint_on=timezone.now() - timedelta(minutes=30),
+            page=1,
+            report={'product': {'created': ['kiwitcms-bot/resume-000'],
+                                'exists': [], 'skipped': []}},
+            counters={'product': {'created': 1, 'exists': 0, 'skipped': 0}},
+        )
+
+        self.assertTrue(worker.process_next_resync_job())
+        self.assertFalse(worker.process_next_resync_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.state, ResyncJob.STATE_DONE)
+        self.assertEqual(job.page, 2)
+        self.assertEqual(job.counters['product'], {'created': 51, 'exists': 0, 'skipped': 0})
+        gh_inst.return_value.get_repos.return_value.get_page.assert_called_once_with(1)
+
+        with tenant_context(self.tenant):
+            self.assertTrue(Product.objects.filter(name='kiwitcms-bot/resume-149').exists())
+            self.assertFalse(Product.objects.filter(name='kiwitcms-bot/resume-099').exists())
+
+    def test_running_job_with_recent_progress_is_not_claimed(self):
+        ResyncJob.objects.create(
+            installation=self.app_inst,
+            tenant_pk=self.tenant.pk,
+            state=ResyncJob.STATE_RUNNING,
+            started_on=timezone.now(),
+            checkpoint_on=timezone.now(),
+        )
+
+        self.assertFalse(worker.process_next_resync_job())
+
+
+class ResyncGithubInstallationsCommandTestCase(LoggedInTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        social_user = UserSocialAuthFactory(user=cls.tester)
+        cls.app_inst = AppInstallationFactory(
+            sender=social_user.uid,
+            tenant_pk=cls.tenant.pk,
+        )
+        cls.unconfigured = AppInstallationFactory(sender=social_user.uid)
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    @unittest.mock.patch('tcms_github_app.utils.github_installation_from_inst')
+    def test_resyncs_configured_installations(self, gh_inst, rpc):
+        rpc.return_value.requester.rate_limiting = (5000, 5000)
+        rpc.return_value.requester.requestJsonAndCheck.return_value = ({}, [])
+        gh_inst.return_value.get_repos.return_value = paginated_list([
+            utils.RepositoryView({
+                'full_name': 'kiwitcms-bot/fleet',
+                'fork': False,
+                'description': '',
+            }, unittest.mock.MagicMock()),
+        ])
+
+        stdout = StringIO()
+        call_command('resync_github_installations', processes=1, full=True, stdout=stdout)
+
+        job = ResyncJob.objects.get(installation=self.app_inst)
+        self.assertTrue(job.full)
+        self.assertEqual(job.state, ResyncJob.STATE_DONE)
+        self.assertFalse(ResyncJob.objects.filter(installation=self.unconfigured).exists())
+
+        output = stdout.getvalue()
+        self.assertIn(f'installation={self.app_inst.installation} tenant={self.tenant.pk}', output)
+        self.assertIn('state=done', output)
+        self.assertIn('api_calls=0', output)
+
+        with tenant_context(self.tenant):
+            self.assertTrue(Product.objects.filter(name='kiwitcms-bot/fleet').exists())
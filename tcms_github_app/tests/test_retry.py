@@ -0,0 +1,108 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import time
+import unittest.mock
+
+import github
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.test import override_settings
+
+from tcms_github_app import ratelimit
+from tcms_github_app import retry
+from tcms_github_app import utils
+
+
+@override_settings(KIWI_GITHUB_APP_CIRCUIT_THRESHOLD=3, KIWI_GITHUB_APP_CIRCUIT_COOLDOWN=60)
+class RetryTestCase(SimpleTestCase):
+    installation = unittest.mock.MagicMock(installation=13579)
+
+    def setUp(self):
+        super().setUp()
+        cache.delete_many([
+            "circuit-failures-for-13579",
+            "circuit-open-for-13579",
+            "token-for-13579",
+        ])
+
+    def test_transient_errors(self):
+        self.assertTrue(retry.is_transient(github.GithubException(502, {}, {})))
+        self.assertTrue(retry.is_transient(github.GithubException(403, {}, {'Retry-After': '30'})))
+        self.assertTrue(retry.is_transient(github.RateLimitExceededException(403, {}, {})))
+
+        self.assertFalse(retry.is_transient(github.GithubException(403, {}, {})))
+        self.assertFalse(retry.is_transient(github.UnknownObjectException(404, {}, {})))
+        self.assertFalse(retry.is_transient(ValueError()))
+
+    def test_retry_at_honours_retry_after(self):
+        before = time.time()
+        retry_at = retry.retry_at(github.GithubException(403, {}, {'Retry-After': '30'}))
+        self.assertTrue(before + 30 <= retry_at <= time.time() + 30)
+
+        reset = int(time.time()) + 600
+        self.assertEqual(
+            reset + 1,
+            retry.retry_at(github.RateLimitExceededException(
+                403, {}, {'x-ratelimit-remaining': '0', 'x-ratelimit-reset': str(reset)})),
+        )
+
+    def test_circuit_opens_after_repeated_failures(self):
+        func = unittest.mock.MagicMock(side_effect=github.GithubException(502, {}, {}))
+
+        for _ in range(3):
+            with self.assertRaises(github.GithubException):
+                utils.call_github(self.installation, func)
+
+        with self.assertRaises(retry.CircuitOpen):
+            retry.check(13579)
+
+        # workers defer instead of failing
+        with ratelimit.background():
+            with self.assertRaises(ratelimit.RateLimitDeferred):
+                retry.check(13579)
+
+    def test_success_resets_failures(self):
+        failures = [github.GithubException(502, {}, {})] * 2
+        func = unittest.mock.MagicMock(side_effect=failures + ['ok'] + failures)
+
+        for _ in range(2):
+            with self.assertRaises(github.GithubException):
+                utils.call_github(self.installation, func)
+        self.assertEqual('ok', utils.call_github(self.installation, func))
+        for _ in range(2):
+            with self.assertRaises(github.GithubException):
+                utils.call_github(self.installation, func)
+
+        # not raised
+        retry.check(13579)
+
+    def test_other_errors_dont_open_the_circuit(self):
+        func = unittest.mock.MagicMock(side_effect=github.UnknownObjectException(404, {}, {}))
+
+        for _ in range(5):
+            with self.assertRaises(github.UnknownObjectException):
+                utils.call_github(self.installation, func)
+
+        retry.check(13579)
+
+    def test_background_work_is_deferred(self):
+        func = unittest.mock.MagicMock(
+            side_effect=github.GithubException(503, {}, {'Retry-After': '120'}))
+
+        with ratelimit.background():
+            with self.assertRaises(ratelimit.RateLimitDeferred) as context:
+                utils.call_github(self.installation, func)
+
+        self.assertGreaterEqual(context.exception.reset, time.time() + 119)
+
+    def test_bad_credentials_are_retried_with_a_fresh_token(self):
+        func = unittest.mock.MagicMock(
+            side_effect=[github.BadCredentialsException(401, {}, {}), 'ok'])
+
+        with unittest.mock.patch('tcms_github_app.utils.invalidate_token') as invalidate_token:
+            self.assertEqual('ok', utils.call_github(self.installation, func))
+
+        invalidate_token.assert_called_once_with(self.installation)
@@ -1,17 +1,39 @@
-# Copyright (c) 2019-2020 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2019-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
 # pylint: disable=too-many-ancestors
 
+import datetime
 import json
+import time
+import unittest
+import unittest.mock
+
+import github
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_tenants.utils import tenant_context
+
+from tcms.management.models import Classification
+from tcms.management.models import Product
+from tcms.management.models import Version
+from tcms.tests.factories import ProductFactory
+from tcms.tests.factories import VersionFactory
 
 from tcms_tenants.tests import UserFactory
 
+from tcms_github_app import ratelimit
 from tcms_github_app import utils
 from tcms_github_app.models import WebhookPayload
 from tcms_github_app.tests import AnonymousTestCase
+from tcms_github_app.tests import AppInstallationFactory
+from tcms_github_app.tests import github_api
 from tcms_github_app.tests import UserSocialAuthFactory
 
 
@@ -64,3 +86,460 @@ class FindTenantTestCase(AnonymousTestCase):
         tenant, app_inst = utils.find_tenant(wh_payload)
         self.assertIsNone(tenant)
         self.assertIsNone(app_inst)
+
+    def test_result_is_cached_until_installation_changes(self):
+        app_inst = AppInstallationFactory(sender=self.social_user.uid, tenant_pk=self.tenant.pk)
+        wh_payload = WebhookPayload(
+            event='create',
+            sender=self.social_user.uid,
+            payload={'installation': {'id': app_inst.installation}},
+        )
+
+        tenant, found = utils.find_tenant(wh_payload)
+        self.assertEqual(tenant, self.tenant)
+        self.assertEqual(found, app_inst)
+
+        with self.assertNumQueries(0):
+            tenant, found = utils.find_tenant(wh_payload)
+        self.assertEqual(tenant, self.tenant)
+
+        # e.g. changed via admin
+        app_inst.tenant_pk = None
+        app_inst.save()
+
+        tenant, found = utils.find_tenant(wh_payload)
+        self.assertIsNone(tenant)
+        self.assertEqual(found, app_inst)
+
+
+class FindInstallationTestCase(AnonymousTestCase):
+    def test_result_is_cached_until_installations_change(self):
+        request = unittest.mock.MagicMock(tenant=self.tenant, user=self.tester)
+        self.assertIsNone(utils.find_installation(request))
+
+        app_inst = AppInstallationFactory(sender=1234, tenant_pk=self.tenant.pk)
+        self.assertEqual(utils.find_installation(request), app_inst)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(utils.find_installation(request), app_inst)
+
+        # more than one installation for this tenant, none of them by this user
+        AppInstallationFactory(sender=5678, tenant_pk=self.tenant.pk)
+        self.assertIsNone(utils.find_installation(request))
+
+    def test_generation_isnt_reused_after_eviction(self):
+        utils.invalidate_installations()
+        generation = cache.get(utils.INSTALLATIONS_GENERATION_KEY)
+
+        cache.delete(utils.INSTALLATIONS_GENERATION_KEY)
+        utils.invalidate_installations()
+        self.assertNotEqual(cache.get(utils.INSTALLATIONS_GENERATION_KEY), generation)
+
+        cache.delete(utils.INSTALLATIONS_GENERATION_KEY)
+        self.assertNotEqual(utils._installations_generation(),  # pylint: disable=protected-access
+                            generation)
+
+
+class RepositoryViewTestCase(unittest.TestCase):
+    def test_doesnt_call_github_when_payload_has_everything(self):
+        rpc_factory = unittest.mock.MagicMock()
+        repo_object = utils.RepositoryView({
+            "full_name": "kiwitcms-bot/test",
+            "html_url": "https://github.com/kiwitcms-bot/test",
+            "description": "A test repository",
+            "fork": False,
+        }, rpc_factory)
+
+        self.assertFalse(repo_object.fork)
+        self.assertEqual(repo_object.full_name, "kiwitcms-bot/test")
+        self.assertEqual(repo_object.description, "A test repository")
+        self.assertEqual(repo_object.html_url, "https://github.com/kiwitcms-bot/test")
+        rpc_factory.assert_not_called()
+
+    def test_fetches_missing_fields_only_once(self):
+        cache.delete("repository-97531-kiwitcms-bot/it-cpe")
+
+        rpc_factory = unittest.mock.MagicMock()
+        rpc_factory.installation.installation = 97531
+        rpc_factory.return_value.requester.requestJsonAndCheck.side_effect = github_api({
+            "kiwitcms-bot/IT-CPE": {"fork": False, "description": "Fetched from GitHub"},
+        })
+
+        repo_object = utils.RepositoryView({
+            "id": 281502467,
+            "name": "IT-CPE",
+            "full_name": "kiwitcms-bot/IT-CPE",
+            "private": False,
+        }, rpc_factory)
+
+        # derived from full_name
+        self.assertEqual(repo_object.html_url, "https://github.com/kiwitcms-bot/IT-CPE")
+        rpc_factory.assert_not_called()
+
+        self.assertFalse(repo_object.fork)
+        self.assertEqual(repo_object.description, "Fetched from GitHub")
+        rpc_factory.return_value.requester.requestJsonAndCheck.assert_called_once_with(
+            "GET", "/repos/kiwitcms-bot/IT-CPE", headers={})
+
+
+class FindTokenFromAppInstTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.installation = unittest.mock.MagicMock()
+        self.installation.installation = 987654
+        utils.invalidate_token(self.installation)
+        cache.delete(f"token-for-{self.installation.installation}-lock")
+
+    @staticmethod
+    def access_token(token, expires_in):
+        result = unittest.mock.MagicMock()
+        result.token = token
+        result.expires_at = timezone.now() + datetime.timedelta(seconds=expires_in)
+        return result
+
+    def test_token_is_cached_until_shortly_before_expiration(self):
+        gh_app = unittest.mock.MagicMock()
+        gh_app.get_access_token.side_effect = [
+            self.access_token("first", utils.TOKEN_REFRESH_AHEAD + 10),
+            self.access_token("second", 3600),
+        ]
+
+        self.assertEqual(utils.find_token_from_app_inst(gh_app, self.installation), "first")
+        self.assertEqual(utils.find_token_from_app_inst(gh_app, self.installation), "first")
+        gh_app.get_access_token.assert_called_once()
+
+        # within the refresh window
+        with unittest.mock.patch('tcms_github_app.utils.time.time',
+                                 return_value=time.time() + 20):
+            self.assertEqual(utils.find_token_from_app_inst(gh_app, self.installation),
+                             "second")
+
+    def test_old_token_is_used_while_another_process_refreshes_it(self):
+        gh_app = unittest.mock.MagicMock()
+        gh_app.get_access_token.side_effect = [
+            self.access_token("old", utils.TOKEN_REFRESH_AHEAD - 10),
+        ]
+        self.assertEqual(utils.find_token_from_app_inst(gh_app, self.installation), "old")
+
+        # simulate another process holding the lock
+        cache.add(f"token-for-{self.installation.installation}-lock", True)
+
+        self.assertEqual(utils.find_token_from_app_inst(gh_app, self.installation), "old")
+        gh_app.get_access_token.assert_called_once()
+
+    def test_token_is_cached_in_process(self):
+        gh_app = unittest.mock.MagicMock()
+        gh_app.get_access_token.side_effect = [self.access_token("local", 3600)]
+
+        self.assertEqual(utils.find_token_from_app_inst(gh_app, self.installation), "local")
+
+        with unittest.mock.patch('tcms_github_app.utils.cache') as django_cache:
+            self.assertEqual(utils.find_token_from_app_inst(gh_app, self.installation), "local")
+            django_cache.get.assert_not_called()
+
+    def test_invalidate_token(self):
+        gh_app = unittest.mock.MagicMock()
+        gh_app.get_access_token.side_effect = [
+            self.access_token("rejected", 3600),
+            self.access_token("fresh", 3600),
+        ]
+
+        self.assertEqual(utils.find_token_from_app_inst(gh_app, self.installation), "rejected")
+
+        # simulate 401 from GitHub
+        utils.invalidate_token(self.installation)
+
+        self.assertEqual(utils.find_token_from_app_inst(gh_app, self.installation), "fresh")
+
+
+class GithubRpcFromInstTestCase(SimpleTestCase):
+    @unittest.mock.patch('tcms_github_app.utils.find_token_from_app_inst',
+                         return_value='testing-token')
+    def test_connections_are_reused_per_installation(self, _find_token):
+        first = unittest.mock.MagicMock()
+        first.installation = 1234001
+        second = unittest.mock.MagicMock()
+        second.installation = 1234002
+
+        rpc = utils.github_rpc_from_inst(first)
+
+        self.assertIs(rpc, utils.github_rpc_from_inst(first))
+        self.assertIsNot(rpc, utils.github_rpc_from_inst(second))
+
+
+class FetchRepositoriesTestCase(SimpleTestCase):
+    repositories = [
+        {"full_name": "kiwitcms-bot/example"},
+        {"full_name": "kiwitcms-bot/missing"},
+        {"full_name": "kiwitcms-bot/complete", "fork": False, "description": ""},
+    ]
+
+    installation = unittest.mock.MagicMock(installation=86420)
+    # kiwitcms-bot/missing is not found
+    github_repos = {
+        "kiwitcms-bot/example": {"fork": False, "description": "kiwitcms-bot/example description"},
+    }
+
+    def setUp(self):
+        super().setUp()
+        cache.delete_many([
+            f"repository-86420-{repository['full_name']}" for repository in self.repositories
+        ] + ["rate-limit-for-86420", "circuit-failures-for-86420"])
+
+    @staticmethod
+    def rest_requests(github_rpc):
+        return [call for call in github_rpc.return_value.requester.requestJsonAndCheck.mock_calls
+                if call.args[0] == "GET"]
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    def test_skips_repositories_which_cant_be_fetched(self, github_rpc):
+        github_rpc.return_value.requester.rate_limiting = (5000, 5000)
+        github_rpc.return_value.requester.requestJsonAndCheck.side_effect = github_api(
+            self.github_repos)
+
+        repo_objects = utils.fetch_repositories(self.installation, self.repositories)
+
+        self.assertEqual(["kiwitcms-bot/example", "kiwitcms-bot/complete"],
+                         [repo_object.full_name for repo_object in repo_objects])
+        self.assertEqual("kiwitcms-bot/example description", repo_objects[0].description)
+        # only incomplete repositories are fetched
+        self.assertEqual(2, len(self.rest_requests(github_rpc)))
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    def test_defers_when_rate_limit_is_low(self, github_rpc):
+        github_rpc.return_value.requester.requestJsonAndCheck.side_effect = github_api(
+            self.github_repos)
+        # reported by any connection object for this installation
+        requester = unittest.mock.MagicMock()
+        requester.rate_limiting = (10, 5000)
+        requester.rate_limiting_resettime = int(time.time()) + 600
+        ratelimit.record(86420, requester)
+
+        with self.assertRaises(ratelimit.RateLimitDeferred):
+            utils.fetch_repositories(self.installation, self.repositories)
+
+        self.assertEqual([], self.rest_requests(github_rpc))
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    def test_fails_when_github_is_having_trouble(self, github_rpc):
+        github_rpc.return_value.requester.requestJsonAndCheck.side_effect = [
+            ({}, {"data": {}}),
+            github.GithubException(502, {}, {}),
+            github.GithubException(502, {}, {}),
+        ]
+
+        with self.assertRaises(github.GithubException):
+            utils.fetch_repositories(self.installation, self.repositories)
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    def test_fetches_cached_repositories_from_cache(self, github_rpc):
+        github_rpc.return_value.requester.rate_limiting = (5000, 5000)
+        github_rpc.return_value.requester.requestJsonAndCheck.side_effect = github_api(
+            self.github_repos)
+
+        utils.fetch_repositories(self.installation, self.repositories)
+        github_rpc.return_value.requester.requestJsonAndCheck.reset_mock()
+
+        repo_objects = utils.fetch_repositories(self.installation, self.repositories[:1])
+
+        self.assertEqual("kiwitcms-bot/example description", repo_objects[0].description)
+        github_rpc.return_value.requester.requestJsonAndCheck.assert_not_called()
+
+    @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
+    def test_fetches_via_graphql_first(self, github_rpc):
+        github_rpc.return_value.requester.rate_limiting = (5000, 5000)
+        github_rpc.return_value.requester.requestJsonAndCheck.side_effect = github_api(
+            self.github_repos,
+            graphql={
+                "data": {
+                    "r0": {
+                        "nameWithOwner": "kiwitcms-bot/example",
+                        "isFork": True,
+                        "description": "Via GraphQL",
+                        "url": "https://github.com/kiwitcms-bot/example",
+                    },
+                    "r1": None,
+                },
+            },
+        )
+
+        repo_objects = utils.fetch_repositories(self.installation, self.repositories)
+
+        self.assertEqual(["kiwitcms-bot/example", "kiwitcms-bot/complete"],
+                         [repo_object.full_name for repo_object in repo_objects])
+        self.assertTrue(repo_objects[0].fork)
+        self.assertEqual("Via GraphQL", repo_objects[0].description)
+
+        # single query for both incomplete repositories and
+        # only the repository which wasn't found via GraphQL
+        self.assertEqual(2, github_rpc.return_value.requester.requestJsonAndCheck.call_count)
+        self.assertEqual([unittest.mock.call("GET", "/repos/kiwitcms-bot/missing", headers={})],
+                         self.rest_requests(github_rpc))
+
+
+class ImportRepositoriesTestCase(AnonymousTestCase):
+    @staticmethod
+    def repo(full_name, fork=False):
+        return utils.RepositoryView({
+            "full_name": full_name,
+            "fork": fork,
+            "description": "",
+        }, unittest.mock.MagicMock())
+
+    def test_creates_only_missing_records(self):
+        with tenant_context(self.tenant):
+            ProductFactory(name='kiwitcms-bot/existing')
+
+            products, bug_systems = utils.import_repositories([
+                self.repo('kiwitcms-bot/existing'),
+                self.repo('kiwitcms-bot/new'),
+                self.repo('kiwitcms-bot/fork', fork=True),
+            ])
+
+            self.assertEqual(
+                [('kiwitcms-bot/existing', utils.RECORD_EXISTS),
+                 ('kiwitcms-bot/new', utils.RECORD_CREATED)],
+                [(product.name, db_status) for product, db_status in products])
+            self.assertEqual(
+                [('GitHub Issues for kiwitcms-bot/existing', utils.RECORD_CREATED),
+                 ('GitHub Issues for kiwitcms-bot/new', utils.RECORD_CREATED)],
+                [(bug_system.name, db_status) for bug_system, db_status in bug_systems])
+
+            self.assertEqual(Product.objects.get(name='kiwitcms-bot/new').description,
+                             'GitHub repository')
+            self.assertFalse(Product.objects.filter(name='kiwitcms-bot/fork').exists())
+
+            # nothing new the second time
+            products, bug_systems = utils.import_repositories([
+                self.repo('kiwitcms-bot/existing'),
+                self.repo('kiwitcms-bot/new'),
+            ])
+            for _record, db_status in products + bug_systems:
+                self.assertEqual(db_status, utils.RECORD_EXISTS)
+
+    def test_number_of_queries_doesnt_depend_on_number_of_repositories(self):
+        query_counts = []
+
+        with tenant_context(self.tenant):
+            # otherwise created during the first import only
+            Classification.objects.get_or_create(name='Imported from GitHub')
+
+            for count in (2, 20):
+                with CaptureQueriesContext(connection) as context:
+                    products, _bug_systems = utils.import_repositories([
+                        self.repo(f'kiwitcms-bot/bulk-{count}-{i}') for i in range(count)
+                    ])
+                query_counts.append(len(context.captured_queries))
+                self.assertEqual(count, len(products))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+
+class FetchTagNamesTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        for page in (1, 2):
+            cache.delete(f"tags-for-kiwitcms-bot/tags-page-{page}")
+
+    def test_pages_not_modified_are_taken_from_cache(self):
+        first_page = [{'name': f'v{index}'} for index in range(utils.TAGS_PER_PAGE)]
+
+        rpc = unittest.mock.MagicMock()
+        rpc.requester.requestJsonAndCheck.side_effect = [
+            ({'etag': '"page-1"'}, first_page),
+            ({'etag': '"page-2"'}, [{'name': 'v1.0'}]),
+            # 304 Not Modified for both pages
+            ({'etag': '"page-1"'}, None),
+            ({'etag': '"page-2"'}, None),
+        ]
+
+        names = utils.fetch_tag_names(rpc, 'kiwitcms-bot/tags')
+        self.assertEqual(len(names), utils.TAGS_PER_PAGE + 1)
+        self.assertEqual(names, utils.fetch_tag_names(rpc, 'kiwitcms-bot/tags'))
+
+        calls = rpc.requester.requestJsonAndCheck.call_args_list
+        self.assertEqual(calls[0].kwargs['headers'], {})
+        self.assertEqual(calls[2].kwargs['headers'], {'If-None-Match': '"page-1"'})
+        self.assertEqual(calls[3].kwargs['parameters']['page'], 2)
+        self.assertEqual(calls[3].kwargs['headers'], {'If-None-Match': '"page-2"'})
+
+
+class ImportTagsTestCase(AnonymousTestCase):
+    def test_creates_only_missing_versions(self):
+        with tenant_context(self.tenant):
+            product = ProductFactory(name='kiwitcms-bot/versions')
+            VersionFactory(product=product, value='v1.0')
+
+            versions = utils.import_tags(product, ['v1.0', 'v2.0', 'v2.0', 'v3.0'])
+
+            self.assertEqual(['v2.0', 'v3.0'], [version.value for version, _status in versions])
+            self.assertEqual(
+                3, Version.objects.filter(product=product, value__startswith='v').count())
+
+
+class RepositoryCacheTestCase(SimpleTestCase):
+    installation = unittest.mock.MagicMock(installation=75319)
+
+    def setUp(self):
+        super().setUp()
+        cache.delete_many([
+            "repository-75319-kiwitcms-bot/example",
+            "repository-75319-kiwitcms-bot/renamed",
+            "repository-75319-kiwitcms/example",
+        ])
+
+    def test_stale_metadata_is_revalidated(self):
+        rpc = unittest.mock.MagicMock()
+        rpc.requester.requestJsonAndCheck.side_effect = [
+            ({"etag": '"abc"'}, {"full_name": "kiwitcms-bot/example", "description": "Example"}),
+            # 304 Not Modified
+            ({"etag": '"abc"'}, None),
+        ]
+
+        repo = utils.fetch_repository(self.installation, rpc, "kiwitcms-bot/example")
+        self.assertEqual("Example", repo.description)
+
+        # fresh, taken from cache
+        repo = utils.fetch_repository(self.installation, rpc, "kiwitcms-bot/example")
+        rpc.requester.requestJsonAndCheck.assert_called_once()
+
+        with override_settings(KIWI_GITHUB_APP_REPOSITORY_CACHE_TIMEOUT=0):
+            repo = utils.fetch_repository(self.installation, rpc, "kiwitcms-bot/example")
+
+        self.assertEqual("Example", repo.description)
+        rpc.requester.requestJsonAndCheck.assert_called_with(
+            "GET", "/repos/kiwitcms-bot/example", headers={"If-None-Match": '"abc"'})
+
+    def test_renamed_repository_is_forgotten_under_both_names(self):
+        for full_name in ["kiwitcms-bot/example", "kiwitcms-bot/renamed"]:
+            cache.set(f"repository-75319-{full_name}",
+                      {"etag": '"abc"', "data": {}, "fetched_at": time.time()})
+
+        utils.forget_repository(WebhookPayload(
+            event="repository",
+            action="renamed",
+            payload={
+                "installation": {"id": 75319},
+                "repository": {"full_name": "kiwitcms-bot/renamed"},
+                "changes": {"repository": {"name": {"from": "example"}}},
+            },
+        ))
+
+        self.assertIsNone(cache.get("repository-75319-kiwitcms-bot/example"))
+        self.assertIsNone(cache.get("repository-75319-kiwitcms-bot/renamed"))
+
+    def test_transferred_repository_is_forgotten_under_the_old_owner(self):
+        cache.set("repository-75319-kiwitcms-bot/example",
+                  {"etag": '"abc"', "data": {}, "fetched_at": time.time()})
+
+        utils.forget_repository(WebhookPayload(
+            event="repository",
+            action="transferred",
+            payload={
+                "installation": {"id": 75319},
+                "repository": {"full_name": "kiwitcms/example"},
+                "changes": {"owner": {"from": {"user": {"login": "kiwitcms-bot"}}}},
+            },
+        ))
+
+        self.assertIsNone(cache.get("repository-75319-kiwitcms-bot/example"))
@@ -1,4 +1,4 @@
-# Copyright (c) 2019-2021 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2019-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
@@ -6,12 +6,14 @@
 # pylint: disable=too-many-ancestors, too-many-lines
 
 import json
+from datetime import timedelta
 from http import HTTPStatus
 import unittest.mock
 
 from django.urls import reverse
 from django.conf import settings
 from django.http import HttpResponseForbidden
+from django.utils import timezone
 
 from django_tenants.utils import get_tenant_model
 from django_tenants.utils import get_tenant_domain_model
@@ -29,10 +31,12 @@ from tcms.testcases.models import BugSystem
 from tcms_tenants.tests import LoggedInTestCase
 from tcms_tenants.tests import UserFactory
 
+from tcms_github_app import ratelimit
 from tcms_github_app.models import AppInstallation
 from tcms_github_app.models import WebhookPayload
 from tcms_github_app.tests import AnonymousTestCase
 from tcms_github_app.tests import AppInstallationFactory
+from tcms_github_app.tests import github_api
 from tcms_github_app.tests import UserSocialAuthFactory
 
 
@@ -135,6 +139,151 @@ class WebHookTestCase(AnonymousTestCase):
                             'Missing event',
                             status_code=HTTPStatus.FORBIDDEN)
 
+    @unittest.mock.patch('tcms_github_app.views.WebHook.handle_payload')
+    def test_redelivery_is_not_processed_again(self, handle_payload):
+        payload = """
+{
+  "action": "will-be-redelivered",
+  "sender": {
+    "login": "kiwitcms-bot",
+    "id": 1002300
+  }
+}
+""".strip()
+
+        signature = github.calculate_signature(
+            settings.KIWI_GITHUB_APP_SECRET,
+            json.dumps(json.loads(payload)).encode())
+
+        initial_db_count = WebhookPayload.objects.count()
+
+        for _ in range(2):
+            response = self.client.post(self.url,
+                                        json.loads(payload),
+                                        content_type='application/json',
+                                        HTTP_X_HUB_SIGNATURE=signature,
+                                        HTTP_X_GITHUB_EVENT='some-event',
+                                        HTTP_X_GITHUB_DELIVERY='72d3162e-cc78-11e3-81ab-4c9367dc0958')
+            self.assertContains(response, 'ok')
+
+        self.assertEqual(initial_db_count + 1, WebhookPayload.objects.count())
+        handle_payload.assert_called_once()
+
+    @unittest.mock.patch('tcms_github_app.views.WebHook.handle_payload')
+    def test_redelivery_of_failed_payload_is_processed_again(self, handle_payload):
+        payload = """
+{
+  "action": "failed-before",
+  "sender": {
+    "login": "kiwitcms-bot",
+    "id": 1002300
+  }
+}
+""".strip()
+
+        WebhookPayload.objects.create(
+            event='some-event',
+            action='failed-before',
+            sender=1002300,
+            payload=json.loads(payload),
+            status=WebhookPayload.STATUS_FAILED,
+            delivery='a8ecf8b2-cc78-11e3-81ab-4c9367dc0958',
+        )
+
+        signature = github.calculate_signature(
+            settings.KIWI_GITHUB_APP_SECRET,
+            json.dumps(json.loads(payload)).encode())
+
+        response = self.client.post(self.url,
+                                    json.loads(payload),
+                                    content_type='application/json',
+                                    HTTP_X_HUB_SIGNATURE=signature,
+                                    HTTP_X_GITHUB_EVENT='some-event',
+                                    HTTP_X_GITHUB_DELIVERY='a8ecf8b2-cc78-11e3-81ab-4c9367dc0958')
+
+        self.assertContains(response, 'ok')
+        handle_payload.assert_called_once()
+        self.assertEqual(
+            WebhookPayload.objects.get(
+                delivery='a8ecf8b2-cc78-11e3-81ab-4c9367dc0958').status,
+            WebhookPayload.STATUS_DONE)
+
+    @unittest.mock.patch('tcms_github_app.views.WebHook.handle_payload')
+    def test_redelivery_of_interrupted_payload_is_processed_again(self, handle_payload):
+        payload = """
+{
+  "action": "interrupted",
+  "sender": {
+    "login": "kiwitcms-bot",
+    "id": 1002300
+  }
+}
+""".strip()
+
+        # the request which was processing it got killed
+        wh_payload = WebhookPayload.objects.create(
+            event='some-event',
+            action='interrupted',
+            sender=1002300,
+            payload=json.loads(payload),
+            status=WebhookPayload.STATUS_PENDING,
+            delivery='b4c5d6e7-cc78-11e3-81ab-4c9367dc0958',
+        )
+
+        signature = github.calculate_signature(
+            settings.KIWI_GITHUB_APP_SECRET,
+            json.dumps(json.loads(payload)).encode())
+
+        def redeliver():
+            return self.client.post(self.url,
+                                    json.loads(payload),
+                                    content_type='application/json',
+                                    HTTP_X_HUB_SIGNATURE=signature,
+                                    HTTP_X_GITHUB_EVENT='some-event',
+                                    HTTP_X_GITHUB_DELIVERY='b4c5d6e7-cc78-11e3-81ab-4c9367dc0958')
+
+        # may still be processed by the original request
+        self.assertContains(redeliver(), 'accepted', status_code=HTTPStatus.ACCEPTED)
+        handle_payload.assert_not_called()
+
+        WebhookPayload.objects.filter(pk=wh_payload.pk).update(
+            received_on=timezone.now() - timedelta(hours=1))
+
+        self.assertContains(redeliver(), 'ok')
+        handle_payload.assert_called_once()
+        wh_payload.refresh_from_db()
+        self.assertEqual(wh_payload.status, WebhookPayload.STATUS_DONE)
+
+    @unittest.mock.patch('tcms_github_app.views.WebHook.handle_payload')
+    def test_deferred_payload_fails_without_a_worker(self, handle_payload):
+        handle_payload.side_effect = ratelimit.RateLimitDeferred(1002300, 2000000000)
+        payload = """
+{
+  "action": "deferred",
+  "sender": {
+    "login": "kiwitcms-bot",
+    "id": 1002300
+  }
+}
+""".strip()
+
+        signature = github.calculate_signature(
+            settings.KIWI_GITHUB_APP_SECRET,
+            json.dumps(json.loads(payload)).encode())
+
+        # Django responds with 500 and GitHub redelivers later
+        with self.assertRaises(ratelimit.RateLimitDeferred):
+            self.client.post(self.url,
+                             json.loads(payload),
+                             content_type='application/json',
+                             HTTP_X_HUB_SIGNATURE=signature,
+                             HTTP_X_GITHUB_EVENT='some-event',
+                             HTTP_X_GITHUB_DELIVERY='c1d2e3f4-cc78-11e3-81ab-4c9367dc0958')
+
+        wh_payload = WebhookPayload.objects.get(delivery='c1d2e3f4-cc78-11e3-81ab-4c9367dc0958')
+        self.assertEqual(wh_payload.status, WebhookPayload.STATUS_FAILED)
+        self.assertIsNone(wh_payload.not_before)
+
 
 class HandleRepositoryCreatedTestCase(AnonymousTestCase):
     @classmethod
@@ -464,20 +613,20 @@ class HandleInstallationCreatedTestCase(AnonymousTestCase):
 
     @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
     def test_sender_only_has_access_to_public(self, github_rpc):
-        example_repo = unittest.mock.MagicMock()
-        example_repo.fork = False
-        example_repo.full_name = 'kiwitcms-bot/example'
-        example_repo.description = 'Example description'
-        example_repo.html_url = f'https://github.com/{example_repo.full_name}'
-
-        test_repo = unittest.mock.MagicMock()
-        test_repo.fork = False
-        test_repo.full_name = 'kiwitcms-bot/test'
-        test_repo.description = 'Test description'
-        test_repo.html_url = f'https://github.com/{test_repo.full_name}'
-
-        github_rpc.return_value.get_repo = unittest.mock.MagicMock(
-            side_effect=[example_repo, test_repo])
+        github_rpc.return_value.requester.rate_limiting = (5000, 5000)
+        # GraphQL didn't return anything, fall back to REST
+        github_rpc.return_value.requester.requestJsonAndCheck.side_effect = github_api({
+            'kiwitcms-bot/example': {
+                'fork': False,
+                'description': 'Example description',
+                'html_url': 'https://github.com/kiwitcms-bot/example',
+            },
+            'kiwitcms-bot/test': {
+                'fork': False,
+                'description': 'Test description',
+                'html_url': 'https://github.com/kiwitcms-bot/test',
+            },
+        })
 
         # assert products don't exist initially
         for tenant in [self.public_tenant, self.tenant, self.private_tenant]:
@@ -572,20 +721,20 @@ class HandleInstallationCreatedTestCase(AnonymousTestCase):
 
     @unittest.mock.patch('tcms_github_app.utils.github_rpc_from_inst')
     def test_sender_only_has_access_to_private_tenant(self, github_rpc):
-        example_repo = unittest.mock.MagicMock()
-        example_repo.fork = False
-        example_repo.full_name = 'kiwitcms-bot/example'
-        example_repo.description = 'Example description'
-        example_repo.html_url = f'https://github.com/{example_repo.full_name}'
-
-        test_repo = unittest.mock.MagicMock()
-        test_repo.fork = False
-        test_repo.full_name = 'kiwitcms-bot/test'
-        test_repo.description = 'Test description'
-        test_repo.html_url = f'https://github.com/{test_repo.full_name}'
-
-        github_rpc.return_value.get_repo = unittest.mock.MagicMock(
-            side_effect=[example_repo, test_repo])
+        github_rpc.return_value.requester.rate_limiting = (5000, 5000)
+        # GraphQL didn't return anything, fall back to REST
+        github_rpc.return_value.requester.requestJsonAndCheck.side_effect = github_api({
+            'kiwitcms-bot/example': {
+                'fork': False,
+                'description': 'Example description',
+                'html_url': 'https://github.com/kiwitcms-bot/example',
+            },
+            'kiwitcms-bot/test': {
+                'fork': False,
+                'description': 'Test description',
+                'html_url': 'https://github.com/kiwitcms-bot/test',
+            },
+        })
 
         with schema_context('public'):
             # make sure social_user can access private_tenant
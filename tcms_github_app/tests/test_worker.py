@@ -0,0 +1,128 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+# pylint: disable=too-many-ancestors
+
+import json
+import time
+from http import HTTPStatus
+import unittest.mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from tcms.utils import github
+
+from tcms_github_app import ratelimit
+from tcms_github_app import worker
+from tcms_github_app.models import WebhookPayload
+from tcms_github_app.tests import AnonymousTestCase
+
+
+class AsyncWebHookTestCase(AnonymousTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.url = reverse('github_app_webhook')
+
+    def post_payload(self):
+        payload = """
+{
+  "action": "will-be-processed-later",
+  "sender": {
+    "login": "kiwitcms-bot",
+    "id": 1002300
+  }
+}
+""".strip()
+
+        signature = github.calculate_signature(
+            settings.KIWI_GITHUB_APP_SECRET,
+            json.dumps(json.loads(payload)).encode())
+
+        return self.client.post(self.url,
+                                json.loads(payload),
+                                content_type='application/json',
+                                HTTP_X_HUB_SIGNATURE=signature,
+                                HTTP_X_GITHUB_EVENT='some-event')
+
+    @override_settings(KIWI_GITHUB_APP_ASYNC_WEBHOOKS=True)
+    @unittest.mock.patch('tcms_github_app.views.WebHook.handle_payload')
+    def test_webhook_is_acknowledged_and_processed_by_worker(self, handle_payload):
+        response = self.post_payload()
+
+        self.assertContains(response, 'accepted', status_code=HTTPStatus.ACCEPTED)
+        handle_payload.assert_not_called()
+
+        wh_payload = WebhookPayload.objects.filter(action='will-be-processed-later').last()
+        self.assertEqual(wh_payload.status, WebhookPayload.STATUS_PENDING)
+
+        # drain the queue
+        while worker.process_next_payload():
+            pass
+
+        handle_payload.assert_called_once()
+        wh_payload.refresh_from_db()
+        self.assertEqual(wh_payload.status, WebhookPayload.STATUS_DONE)
+        self.assertIsNotNone(wh_payload.processed_on)
+
+    @override_settings(KIWI_GITHUB_APP_ASYNC_WEBHOOKS=True)
+    @unittest.mock.patch('tcms_github_app.views.WebHook.handle_payload',
+                         side_effect=RuntimeError('GitHub is down'))
+    def test_failed_payload_doesnt_stop_the_worker(self, _handle_payload):
+        self.post_payload()
+        wh_payload = WebhookPayload.objects.filter(action='will-be-processed-later').last()
+
+        self.assertTrue(worker.process_next_payload())
+        self.assertFalse(worker.process_next_payload())
+
+        wh_payload.refresh_from_db()
+        self.assertEqual(wh_payload.status, WebhookPayload.STATUS_FAILED)
+
+    @override_settings(KIWI_GITHUB_APP_ASYNC_WEBHOOKS=True)
+    @unittest.mock.patch('tcms_github_app.views.WebHook.handle_payload')
+    def test_database_error_is_recorded_as_failure(self, handle_payload):
+        def handle(_payload):
+            # aborts the current transaction
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT * FROM tcms_github_app_no_such_table")
+
+        handle_payload.side_effect = handle
+
+        self.post_payload()
+        wh_payload = WebhookPayload.objects.filter(action='will-be-processed-later').last()
+
+        self.assertTrue(worker.process_next_payload())
+        # not claimed again
+        self.assertFalse(worker.process_next_payload())
+
+        wh_payload.refresh_from_db()
+        self.assertEqual(wh_payload.status, WebhookPayload.STATUS_FAILED)
+
+    @override_settings(KIWI_GITHUB_APP_ASYNC_WEBHOOKS=True)
+    @unittest.mock.patch('tcms_github_app.views.WebHook.handle_payload')
+    def test_payload_is_deferred_until_rate_limit_reset(self, handle_payload):
+        reset = time.time() + 3600
+
+        def handle(_payload):
+            # the worker marks requests as background work
+            self.assertTrue(ratelimit.is_background())
+            raise ratelimit.RateLimitDeferred(1234, reset)
+
+        handle_payload.side_effect = handle
+
+        self.post_payload()
+        wh_payload = WebhookPayload.objects.filter(action='will-be-processed-later').last()
+
+        self.assertTrue(worker.process_next_payload())
+        # not picked up again before the reset
+        self.assertFalse(worker.process_next_payload())
+        handle_payload.assert_called_once()
+
+        wh_payload.refresh_from_db()
+        self.assertEqual(wh_payload.status, WebhookPayload.STATUS_PENDING)
+        self.assertEqual(wh_payload.not_before.timestamp(), int(reset))
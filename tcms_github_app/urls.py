@@ -1,4 +1,4 @@
-# Copyright (c) 2019-2020 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2019-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
@@ -10,5 +10,9 @@ from tcms_github_app import views
 urlpatterns = [
     re_path(r'^appedit/$', views.ApplicationEdit.as_view(), name='github_app_edit'),
     re_path(r'^resync/$', views.Resync.as_view(), name='github_app_resync'),
+    re_path(r'^resync/(?P<pk>\d+)/$', views.ResyncJobView.as_view(),
+            name='github_app_resync_job'),
+    re_path(r'^resync/(?P<pk>\d+)/status/$', views.ResyncJobStatus.as_view(),
+            name='github_app_resync_job_status'),
     re_path(r'^webhook/$', views.WebHook.as_view(), name='github_app_webhook'),
 ]
@@ -1,16 +1,27 @@
-# Copyright (c) 2019-2025 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2019-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from django.conf import settings
 from django.contrib import messages
 from django.core.cache import cache
 from django.db import IntegrityError
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 
 import github
 from django_tenants.utils import tenant_context
+from github.Requester import WithRequester
 from social_django.models import UserSocialAuth
 
 from tcms.management.models import Classification
@@ -19,13 +30,60 @@ from tcms.management.models import Version
 from tcms.testcases.models import BugSystem
 
 from tcms_tenants.models import Tenant
+from tcms_github_app import auth
+from tcms_github_app import graphql
+from tcms_github_app import ratelimit
+from tcms_github_app import retry
+from tcms_github_app.local_cache import LocalCache
 from tcms_github_app.models import AppInstallation
+from tcms_github_app.models import IssueMirror
+from tcms_github_app.models import ResyncJob
 
 
 RECORD_SKIPPED = 0
 RECORD_EXISTS = 10
 RECORD_CREATED = 20
 
+# installation access tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_AHEAD = 300
+# while another process refreshes the token keep using the old one if it is
+# valid for at least this many seconds, otherwise wait for the new one
+TOKEN_MIN_TTL = 60
+# for how long a process may hold the token refresh lock
+TOKEN_LOCK_TIMEOUT = 30
+
+# installation to tenant mapping is cached for this many seconds
+TENANT_CACHE_TIMEOUT = 3600
+# actions of `issues` webhooks which update IssueMirror
+MIRRORED_ISSUE_ACTIONS = (
+    'opened', 'edited', 'closed', 'reopened', 'labeled', 'unlabeled',
+    'deleted', 'transferred',
+)
+
+# changed to invalidate results of find_installation()
+INSTALLATIONS_GENERATION_KEY = 'github-app-installations-generation'
+
+# repositories are listed this many per page, see github_rpc_from_inst()
+REPOS_PER_PAGE = 100
+# tags are listed with the largest page size allowed by GitHub
+TAGS_PER_PAGE = 100
+# ETags for pages of tags are kept for a week
+TAGS_CACHE_TIMEOUT = 7 * 24 * 3600
+# repository metadata and its ETag is kept for revalidation for a week
+REPOSITORY_ETAG_TIMEOUT = 7 * 24 * 3600
+# actions of `repository` webhooks which invalidate cached metadata
+REPOSITORY_CHANGED_ACTIONS = ('edited', 'renamed', 'transferred', 'deleted')
+
+# in-process tier in front of the Django cache, see _cached_token()
+_LOCAL_TOKENS = LocalCache(maxsize=256, ttl=300)
+
+# connection objects reused between calls, see github_rpc_from_inst()
+_CLIENTS = threading.local()
+
+# threads which fetch repositories, see _fetch_executor()
+_FETCH_EXECUTOR = None
+_FETCH_EXECUTOR_LOCK = threading.Lock()
+
 
 class PatchedGithub(github.Github):
     def get_installation(self, inst_id):
@@ -40,31 +98,411 @@ class PatchedGithub(github.Github):
         )
 
 
+def _repository_cache_key(installation_id, full_name):
+    return f"repository-{installation_id}-{full_name.lower()}"
+
+
+def invalidate_repository(installation_id, full_name):
+    cache.delete(_repository_cache_key(installation_id, full_name))
+
+
+def _is_fresh(cached):
+    return cached and time.time() - cached['fetched_at'] < getattr(
+        settings, 'KIWI_GITHUB_APP_REPOSITORY_CACHE_TIMEOUT', 3600)
+
+
+def fetch_repository(installation, rpc, full_name):
+    """
+        Returns a github.Repository.Repository object. Responses are cached
+        for KIWI_GITHUB_APP_REPOSITORY_CACHE_TIMEOUT seconds and revalidated
+        with a conditional request afterwards. GitHub doesn't count
+        304 Not Modified against the rate limit! ``repository`` webhooks
+        invalidate the cache, see forget_repository().
+    """
+    cache_key = _repository_cache_key(installation.installation, full_name)
+
+    cached = cache.get(cache_key)
+    if _is_fresh(cached):
+        return github.Repository.Repository(rpc.requester, {}, cached['data'], completed=True)
+
+    headers = {}
+    if cached:
+        headers['If-None-Match'] = cached['etag']
+
+    response_headers, data = call_github(
+        installation,
+        rpc.requester.requestJsonAndCheck,
+        "GET", f"/repos/{full_name}", headers=headers,
+    )
+
+    # body is empty only for 304 Not Modified
+    if data is None and cached:
+        data = cached['data']
+
+    if response_headers.get('etag'):
+        cache.set(
+            cache_key,
+            {'etag': response_headers['etag'], 'data': data, 'fetched_at': time.time()},
+            REPOSITORY_ETAG_TIMEOUT,
+        )
+
+    return github.Repository.Repository(rpc.requester, response_headers, data, completed=True)
+
+
+class RepositoryView:
+    """
+        Lightweight stand-in for github.Repository.Repository which is built
+        from the repository information already present in webhook payloads.
+
+        Attributes missing from the payload, e.g. ``fork`` and ``description``
+        for ``installation`` events, are fetched from GitHub on first access!
+    """
+    FIELDS = ('full_name', 'fork', 'description', 'html_url')
+
+    def __init__(self, data, rpc_factory):
+        self._data = dict(data)
+        self._rpc_factory = rpc_factory
+        self._repo_object = None
+
+        if 'html_url' not in self._data and 'full_name' in self._data:
+            self._data['html_url'] = f"https://github.com/{self._data['full_name']}"
+
+    def __getattr__(self, name):
+        # only called when regular attribute lookup fails
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        if name in self._data:
+            return self._data[name]
+
+        self.fetch()
+        return getattr(self._repo_object, name)
+
+    def update(self, data):
+        self._data.update(data)
+
+    def needs_fetch(self):
+        if self._repo_object is not None:
+            return False
+
+        return any(field not in self._data for field in self.FIELDS)
+
+    def fetch(self):
+        """
+            Fetch this repository from GitHub unless already done
+        """
+        if self._repo_object is None:
+            self._repo_object = fetch_repository(
+                self._rpc_factory.installation, self._rpc_factory(), self._data['full_name'])
+
+
+class LazyConnection:
+    """
+        Callable which creates the GitHub connection only if
+        RepositoryView needs to fetch something!
+    """
+    def __init__(self, installation):
+        self.installation = installation
+
+    def __call__(self):
+        # reused per thread, see github_rpc_from_inst()
+        return github_rpc_from_inst(self.installation)
+
+
+def fetch_repositories(installation, repositories):
+    """
+        Returns RepositoryView objects for repositories listed in a webhook
+        payload. Information missing from the payload is taken from the
+        repository cache or fetched in batches via GraphQL, then whatever
+        is still missing is fetched concurrently.
+
+        Repositories which don't exist on GitHub are skipped. When the rate
+        limit is almost used up, or GitHub is having trouble, an exception
+        is raised instead so that the whole payload is processed again later.
+        Importing only some of the repositories would go unnoticed!
+    """
+    rpc_factory = LazyConnection(installation)
+    repo_objects = [RepositoryView(repository, rpc_factory) for repository in repositories]
+    incomplete = [repo_object for repo_object in repo_objects if repo_object.needs_fetch()]
+
+    if not incomplete:
+        return repo_objects
+
+    cached = cache.get_many([
+        _repository_cache_key(installation.installation, repo_object.full_name)
+        for repo_object in incomplete
+    ])
+    for repo_object in incomplete:
+        entry = cached.get(_repository_cache_key(installation.installation, repo_object.full_name))
+        if _is_fresh(entry):
+            repo_object.update(entry['data'])
+
+    incomplete = [repo_object for repo_object in incomplete if repo_object.needs_fetch()]
+    if not incomplete:
+        return repo_objects
+
+    batch = call_github(
+        installation,
+        graphql.fetch_repositories,
+        rpc_factory(),
+        [repo_object.full_name for repo_object in incomplete],
+    )
+    for repo_object in incomplete:
+        repo_object.update(batch.get(repo_object.full_name, {}))
+
+    incomplete = [repo_object for repo_object in incomplete if repo_object.needs_fetch()]
+    if not incomplete:
+        return repo_objects
+
+    def prefetch(repo_object):
+        # leave some budget for other operations. Shared by all threads &
+        # processes, unlike connection objects which know only about their
+        # own requests
+        current = ratelimit.status(installation.installation)
+        if current and current['remaining'] < ratelimit.reserve():
+            raise ratelimit.RateLimitDeferred(installation.installation, current['reset'])
+
+        try:
+            repo_object.fetch()
+        except github.UnknownObjectException:
+            # KIWI-TCMS-EA
+            # https://sentry.io/organizations/kiwitcms/issues/1869016907/
+            # Not sure when & how this happens, the repo is accessible on GitHub but
+            # it is a fork, not a source repo.
+            # In any case, if we can't get the data from GitHub there's nothing
+            # we can do here!
+            return False
+
+        return True
+
+    # executor threads don't inherit context variables, e.g. ratelimit.background()
+    contexts = [contextvars.copy_context() for _ in incomplete]
+    fetched = dict(zip(incomplete, _fetch_executor().map(
+        lambda context, repo_object: context.run(prefetch, repo_object),
+        contexts,
+        incomplete,
+    )))
+
+    return [repo_object for repo_object in repo_objects if fetched.get(repo_object, True)]
+
+
+def _fetch_executor():
+    """
+        Threads used by fetch_repositories() live as long as the process so
+        that their connection objects, see _client_registry(), are reused
+        instead of paying for new TLS handshakes on every webhook!
+    """
+    global _FETCH_EXECUTOR  # pylint: disable=global-statement
+
+    with _FETCH_EXECUTOR_LOCK:
+        if _FETCH_EXECUTOR is None:
+            _FETCH_EXECUTOR = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'KIWI_GITHUB_APP_FETCH_CONCURRENCY', 8),
+                thread_name_prefix='github-app-fetch',
+            )
+
+    return _FETCH_EXECUTOR
+
+
+class InstallationTokenAuth(github.Auth.Token, WithRequester):
+    """
+        Looks up the installation access token before every request so
+        that long-lived connection objects always use a valid token!
+
+        Before every request the rate limit reported by the previous
+        response is recorded and background work is deferred when the
+        rest is reserved for interactive operations, see ratelimit.py!
+    """
+    def __init__(self, installation):
+        self._installation = installation
+        super().__init__(self.token)
+        # github.Auth.Token.__init__() doesn't call it
+        WithRequester.__init__(self)
+
+    @property
+    def token(self):
+        return find_token_from_app_inst(auth.get_integration(), self._installation)
+
+    def authentication(self, headers):
+        if self.requester is not None:
+            ratelimit.record(self._installation.installation, self.requester)
+        ratelimit.check(self._installation.installation)
+        retry.check(self._installation.installation)
+
+        super().authentication(headers)
+
+
+def _cache_token(cache_key, cached):
+    """
+        Stores the token in both the local and the Django cache
+    """
+    _LOCAL_TOKENS.set(
+        cache_key,
+        cached,
+        min(_LOCAL_TOKENS.ttl, max(cached['expires_at'] - time.time() - TOKEN_MIN_TTL, 1)),
+    )
+    cache.set(
+        cache_key,
+        cached,
+        max(int(cached['expires_at'] - time.time()) - TOKEN_MIN_TTL, 1),
+    )
+
+
+def _cached_token(cache_key, min_ttl):
+    """
+        Returns the cached token if it is valid for at least
+        ``min_ttl`` more seconds, otherwise None!
+    """
+    cached = _LOCAL_TOKENS.get(cache_key)
+    if cached is None:
+        cached = cache.get(cache_key)
+
+        # tokens cached by older versions are plain strings without expiration info
+        if not isinstance(cached, dict):
+            return None
+
+        _LOCAL_TOKENS.set(cache_key, cached)
+
+    if cached['expires_at'] - time.time() < min_ttl:
+        return None
+
+    return cached['token']
+
+
+def invalidate_token(installation):
+    """
+        Forget the cached token, e.g. when GitHub responds with 401
+    """
+    cache_key = f"token-for-{installation.installation}"
+    _LOCAL_TOKENS.delete(cache_key)
+    cache.delete(cache_key)
+
+
+def call_github(installation, func, *args, **kwargs):
+    """
+        Execute ``func`` and if GitHub rejects the token then
+        invalidate it and try once more with a fresh token!
+
+        Individual requests are already retried, see retry.github_retry(),
+        so transient errors which end up here count towards the circuit
+        breaker for this installation. Background work is deferred instead
+        of failing, GitHub redeliveries don't help during an incident!
+    """
+    try:
+        try:
+            result = func(*args, **kwargs)
+        except github.BadCredentialsException:
+            invalidate_token(installation)
+            result = func(*args, **kwargs)
+    except Exception as err:
+        if not retry.is_transient(err):
+            raise
+
+        retry.failure(installation.installation)
+        if ratelimit.is_background():
+            raise ratelimit.RateLimitDeferred(installation.installation,
+                                              retry.retry_at(err)) from err
+        raise
+
+    retry.success(installation.installation)
+    return result
+
+
+def _wait_for_token(cache_key):
+    """
+        Wait for somebody else to refresh the token
+    """
+    deadline = time.time() + TOKEN_LOCK_TIMEOUT
+
+    while time.time() < deadline:
+        token = _cached_token(cache_key, TOKEN_MIN_TTL)
+        if token:
+            return token
+
+        time.sleep(0.1)
+
+    return None
+
+
 def find_token_from_app_inst(gh_app, installation):
     """
         Find an installation access token for this app:
         https://docs.github.com/en/rest/reference/apps#create-an-installation-access-token-for-an-app
 
-        and cache it for 50 mins!
+        and cache it until shortly before it expires! Only one process at a
+        time asks GitHub for a new token for the same installation while the
+        rest keep using the old token or wait for the new one.
     """
     cache_key = f"token-for-{installation.installation}"
 
-    token = cache.get(cache_key)
-    if not token:
-        token = gh_app.get_access_token(installation.installation)
-        token = token.token
-        # token expires after 1 hr so cache it for 50 mins
-        cache.set(cache_key, token, 3000)
+    token = _cached_token(cache_key, TOKEN_REFRESH_AHEAD)
+    if token:
+        return token
 
-    return token
+    lock_key = f"{cache_key}-lock"
+    locked = cache.add(lock_key, True, TOKEN_LOCK_TIMEOUT)
+
+    if not locked:
+        token = _wait_for_token(cache_key)
+        if token:
+            return token
+
+    try:
+        if locked:
+            # in case it was refreshed while we were acquiring the lock
+            token = _cached_token(cache_key, TOKEN_REFRESH_AHEAD)
+            if token:
+                return token
+
+        access_token = gh_app.get_access_token(installation.installation)
+        if access_token.expires_at:
+            expires_at = access_token.expires_at.timestamp()
+        else:
+            # tokens expire after 1 hr
+            expires_at = time.time() + 3600
+
+        _cache_token(cache_key, {'token': access_token.token, 'expires_at': expires_at})
+        return access_token.token
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def _client_registry():
+    """
+        PyGithub reuses the same HTTP connection for all requests made via
+        the same object which isn't safe to share between threads.
+        That's why every thread has its own registry!
+    """
+    if not hasattr(_CLIENTS, 'registry'):
+        _CLIENTS.registry = LocalCache(
+            maxsize=getattr(settings, 'KIWI_GITHUB_APP_MAX_CLIENTS', 64),
+            ttl=3600,
+        )
+    return _CLIENTS.registry
 
 
 def github_rpc_from_inst(installation):
-    gh_app = github.GithubIntegration(settings.KIWI_GITHUB_APP_ID,
-                                      settings.KIWI_GITHUB_APP_PRIVATE_KEY)
+    """
+        Returns a connection object for this installation. Connections are
+        reused so that we don't pay for a new TLS handshake on every call.
+        There's no need to recreate them when the token is rotated b/c
+        InstallationTokenAuth looks it up before every request!
+    """
+    registry = _client_registry()
+
+    rpc = registry.get(installation.installation)
+    if rpc is None:
+        rpc = PatchedGithub(
+            auth=InstallationTokenAuth(installation),
+            pool_size=getattr(settings, 'KIWI_GITHUB_APP_POOL_SIZE', 10),
+            retry=retry.github_retry(),
+            # fewer requests when listing installation repositories
+            per_page=REPOS_PER_PAGE,
+        )
+        registry.set(installation.installation, rpc)
 
-    token = find_token_from_app_inst(gh_app, installation)
-    return PatchedGithub(token)
+    return rpc
 
 
 def github_installation_from_inst(app_inst):
@@ -89,25 +527,88 @@ def find_user_from_sender(sender_id):
     return social_user.user
 
 
+def _tenant_cache_key(installation_id):
+    return f"tenant-for-installation-{installation_id}"
+
+
+def invalidate_tenant(installation_id):
+    """
+        Forget which tenant this installation is using, e.g. when
+        AppInstallation.tenant_pk has been changed
+    """
+    cache.delete(_tenant_cache_key(installation_id))
+
+
 def find_tenant(data):
     """
         return (tenant, app_inst)
 
         Return a Tenant for this installation or None
         if installation doesn't exist/isn't configured yet.
+
+        The result is cached until the AppInstallation or the Tenant
+        record change, see tcms_github_app.signals!
     """
+    cache_key = _tenant_cache_key(data.payload['installation']['id'])
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     app_inst = AppInstallation.objects.filter(
         installation=data.payload['installation']['id']
     ).first()
 
+    # not cached b/c the installation will be saved shortly
     if not app_inst:
         return None, None
 
     tenant = Tenant.objects.filter(pk=app_inst.tenant_pk).first()
+    cache.set(cache_key, (tenant, app_inst), TENANT_CACHE_TIMEOUT)
 
     return tenant, app_inst
 
 
+def _installations_generation():
+    # never reuse a value after the key has been evicted, otherwise
+    # entries cached for that generation would become valid again
+    return cache.get_or_set(INSTALLATIONS_GENERATION_KEY, time.time_ns, None)
+
+
+def invalidate_installations():
+    """
+        Forget all results cached by find_installation(). Called when
+        AppInstallation or UserSocialAuth records change, which is rare!
+    """
+    try:
+        cache.incr(INSTALLATIONS_GENERATION_KEY)
+    except ValueError:
+        # key doesn't exist, see _installations_generation()
+        cache.set(INSTALLATIONS_GENERATION_KEY, time.time_ns(), None)
+
+
+def find_installation(request):
+    """
+        Return the only App installation for the current tenant + user
+        or None if there are none or more than one. The result is cached
+        for a short time, see find_installations()!
+    """
+    # requests made by the bug tracker integration may not have a user
+    user_pk = getattr(getattr(request, 'user', None), 'pk', None)
+    cache_key = (f"installation-for-tenant-{request.tenant.pk}-user-{user_pk}-"
+                 f"{_installations_generation()}")
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached or None
+
+    installations = find_installations(request)
+    app_inst = installations.first() if installations.count() == 1 else None
+
+    # 0 means nothing was found
+    cache.set(cache_key, app_inst or 0,
+              getattr(settings, 'KIWI_GITHUB_APP_INSTALLATION_CACHE_TIMEOUT', 300))
+    return app_inst
+
+
 def find_installations(request):
     """
         Find App installation for the current tenant + user
@@ -127,7 +628,7 @@ def find_installations(request):
 
 def _product_from_repo(repo_object):
     """
-        repo_object is a github.Repository.Repository object
+        repo_object is a github.Repository.Repository or RepositoryView object
 
         Returns (Product, int). The second element indicates status.
     """
@@ -153,11 +654,13 @@ def _product_from_repo(repo_object):
 
     classification, _created = Classification.objects.get_or_create(name='Imported from GitHub')
     try:
-        return Product.objects.create(
-            name=name,
-            description=description,
-            classification=classification,
-        ), RECORD_CREATED
+        # savepoint b/c webhook workers execute inside a transaction
+        with transaction.atomic():
+            return Product.objects.create(
+                name=name,
+                description=description,
+                classification=classification,
+            ), RECORD_CREATED
     except IntegrityError:
         # handles possible race condition, Sentry KIWI-TCMS-FK
         # https://sentry.io/organizations/kiwitcms/issues/2215166216
@@ -168,7 +671,7 @@ def _product_from_repo(repo_object):
 
 def _bugtracker_from_repo(repo_object):
     """
-        repo_object is a github.Repository.Repository object
+        repo_object is a github.Repository.Repository or RepositoryView object
 
         Returns (Product, int). The second element indicates status.
     """
@@ -190,6 +693,81 @@ def _bugtracker_from_repo(repo_object):
     return bug_system, db_status
 
 
+def import_repositories(repo_objects):
+    """
+        Bulk version of _product_from_repo() & _bugtracker_from_repo().
+        Existing records are loaded with a single query for each model.
+
+        Returns a list of (Product, int) and a list of (BugSystem, int) tuples.
+        The second element indicates status. Forks are skipped!
+    """
+    repositories = {}
+    for repo_object in repo_objects:
+        if not repo_object.fork:
+            repositories[repo_object.full_name] = repo_object
+
+    if not repositories:
+        return [], []
+
+    existing_products = set(
+        Product.objects.filter(name__in=repositories.keys()).values_list('name', flat=True)
+    )
+    bug_system_names = {
+        f'GitHub Issues for {name}': repo_object
+        for name, repo_object in repositories.items()
+    }
+    existing_bug_systems = set(
+        BugSystem.objects.filter(
+            name__in=bug_system_names.keys()
+        ).values_list('name', flat=True)
+    )
+
+    new_products = [name for name in repositories if name not in existing_products]
+    if new_products:
+        classification, _created = Classification.objects.get_or_create(
+            name='Imported from GitHub'
+        )
+
+        # conflicts are products created in the meantime by a web hook,
+        # ids are taken from the query below
+        Product.objects.bulk_create(
+            [
+                Product(
+                    name=name,
+                    description=repositories[name].description or 'GitHub repository',
+                    classification=classification,
+                )
+                for name in new_products
+            ],
+            ignore_conflicts=True,
+        )
+
+    BugSystem.objects.bulk_create(
+        [
+            BugSystem(
+                name=name,
+                tracker_type='tcms_github_app.issues.Integration',
+                base_url=repo_object.html_url,
+            )
+            for name, repo_object in bug_system_names.items()
+            if name not in existing_bug_systems
+        ],
+        ignore_conflicts=True,
+    )
+
+    products = [
+        (product, RECORD_EXISTS if product.name in existing_products else RECORD_CREATED)
+        for product in Product.objects.filter(name__in=repositories.keys()).order_by('name')
+    ]
+    bug_systems = [
+        (bug_system, RECORD_EXISTS if bug_system.name in existing_bug_systems else RECORD_CREATED)
+        for bug_system in BugSystem.objects.filter(
+            name__in=bug_system_names.keys()
+        ).order_by('name')
+    ]
+    return products, bug_systems
+
+
 def create_product_from_repository(data):
     tenant, installation = find_tenant(data)
 
@@ -198,8 +776,8 @@ def create_product_from_repository(data):
         return
 
     with tenant_context(tenant):
-        rpc = github_rpc_from_inst(installation)
-        repo_object = rpc.get_repo(data.payload['repository']['full_name'])
+        repo_object = RepositoryView(data.payload['repository'],
+                                     LazyConnection(installation))
 
         _product_from_repo(repo_object)
         _bugtracker_from_repo(repo_object)
@@ -216,21 +794,11 @@ def create_product_from_installation_repositories(data):
     if not tenant:
         return
 
+    # fetched before entering tenant_context() b/c it doesn't touch the DB
+    repo_objects = fetch_repositories(installation, data.payload['repositories_added'])
+
     with tenant_context(tenant):
-        rpc = github_rpc_from_inst(installation)
-        for repo in data.payload['repositories_added']:
-            try:
-                repo_object = rpc.get_repo(repo['full_name'])
-                _product_from_repo(repo_object)
-                _bugtracker_from_repo(repo_object)
-            except github.UnknownObjectException:
-                # KIWI-TCMS-EA
-                # https://sentry.io/organizations/kiwitcms/issues/1869016907/
-                # Not sure when & how this happens, the repo is accessible on GitHub but
-                # it is a fork, not a source repo.
-                # In any case, if we can't get the data from GitHub there's nothing
-                # we can do here!
-                continue
+        import_repositories(repo_objects)
 
 
 def create_installation(data):
@@ -264,12 +832,10 @@ def create_installation(data):
     )
 
     if tenant and tenant_pk:
+        repo_objects = fetch_repositories(installation, data.payload['repositories'])
+
         with tenant_context(tenant):
-            rpc = github_rpc_from_inst(installation)
-            for repository in data.payload['repositories']:
-                repo_object = rpc.get_repo(repository['full_name'])
-                _product_from_repo(repo_object)
-                _bugtracker_from_repo(repo_object)
+            import_repositories(repo_objects)
 
 
 def create_version_from_tag(data):
@@ -293,31 +859,453 @@ def create_version_from_tag(data):
         )
 
 
-def resync_message(request, record, db_status):
+def forget_repository(data):
     """
-        Adds a response message indicating if a record was added or
-        it already existed.
+        Invalidate cached metadata, see fetch_repository(), when a
+        ``repository`` webhook says the repository has changed. Renamed and
+        transferred repositories are forgotten under their old name too!
     """
-    if db_status == RECORD_CREATED:
-        messages.add_message(request,
-                             messages.SUCCESS,
-                             _("%s was imported from GitHub") % record)
-    elif db_status == RECORD_EXISTS:
-        messages.add_message(request,
-                             messages.INFO,
-                             _("%s already exists") % record)
+    installation_id = data.payload['installation']['id']
+    repository = data.payload['repository']
+    invalidate_repository(installation_id, repository['full_name'])
+
+    changes = data.payload.get('changes', {})
+    owner, name = repository['full_name'].split('/', 1)
 
+    if data.action == 'renamed':
+        name = changes['repository']['name']['from']
+    elif data.action == 'transferred':
+        previous = changes['owner']['from']
+        owner = (previous.get('user') or previous.get('organization'))['login']
 
-def resync(request, app_inst):
+    invalidate_repository(installation_id, f"{owner}/{name}")
+
+
+def mirror_issue(data):
     """
-        Used when manually trigerring a resync. ATM only Product & BugSystem
-        records are synced. Existing tags/Versions aren't added!
+        Keep IssueMirror up to date with the issue from an ``issues`` webhook
     """
-    gh_inst = github_installation_from_inst(app_inst)
+    tenant, _installation = find_tenant(data)
+
+    # can't handle requests from unconfigured installation
+    if not tenant:
+        return
 
-    for repo_object in gh_inst.get_repos():
-        record, db_status = _product_from_repo(repo_object)
-        resync_message(request, record, db_status)
+    issue = data.payload['issue']
+    lookup = {
+        'tenant_pk': tenant.pk,
+        'repository': data.payload['repository']['full_name'].lower(),
+        'number': issue['number'],
+    }
 
-        _bugtracker_from_repo(repo_object)
-        resync_message(request, record, db_status)
+    if data.action in ('deleted', 'transferred'):
+        IssueMirror.objects.filter(**lookup).delete()
+        return
+
+    updated_at = parse_datetime(issue['updated_at'])
+    values = {
+        'title': issue['title'],
+        'body': issue['body'] or '',
+        'state': issue['state'],
+        'labels': [label['name'] for label in issue.get('labels', [])],
+        'updated_at': updated_at,
+    }
+
+    # webhooks may arrive out of order, never overwrite newer information
+    if IssueMirror.objects.filter(**lookup, updated_at__lte=updated_at).update(**values):
+        return
+
+    if not IssueMirror.objects.filter(**lookup).exists():
+        try:
+            with transaction.atomic():
+                IssueMirror.objects.create(**lookup, **values)
+        except IntegrityError:
+            # created by another webhook in the mean time
+            pass
+
+
+# labels used in resync summaries
+RECORD_TYPES = {
+    'product': _('Products'),
+    'bug_system': _('Bug trackers'),
+    'version': _('Versions'),
+}
+
+RECORD_STATUSES = {
+    RECORD_CREATED: 'created',
+    RECORD_EXISTS: 'exists',
+    RECORD_SKIPPED: 'skipped',
+}
+
+
+def resync_summary(request, job):
+    """
+        Adds a single response message for each record type together
+        with a link to the detailed report. The number of messages
+        doesn't depend on the number of repositories!
+    """
+    for record_type, label in RECORD_TYPES.items():
+        counters = job.counters.get(record_type)
+        if not counters or not any(counters.values()):
+            continue
+
+        messages.add_message(
+            request,
+            messages.SUCCESS if counters['created'] else messages.INFO,
+            _("%(label)s: %(created)d imported from GitHub, "
+              "%(exists)d already exist, %(skipped)d skipped") % {
+                'label': label,
+                'created': counters['created'],
+                'exists': counters['exists'],
+                'skipped': counters['skipped'],
+            },
+        )
+
+    messages.add_message(
+        request,
+        messages.INFO,
+        format_html(
+            '<a href="{}">{}</a>',
+            reverse('github_app_resync_job', args=[job.pk]),
+            _("See the full resync report"),
+        ),
+    )
+
+    if job.error:
+        messages.add_message(request, messages.WARNING, job.error)
+
+
+def _changed_since(repo_object, watermark):
+    for timestamp in (repo_object.updated_at, repo_object.pushed_at):
+        if timestamp and timestamp > watermark:
+            return True
+
+    return False
+
+
+def _repos_needing_sync(repo_objects, watermark):
+    """
+        Repositories which changed since the last successful resync
+        or which aren't mapped to both Product & BugSystem yet!
+    """
+    repo_objects = list(repo_objects)
+    names = [repo_object.full_name for repo_object in repo_objects]
+
+    mapped = set(
+        Product.objects.filter(name__in=names).values_list('name', flat=True)
+    ).intersection(
+        name.replace('GitHub Issues for ', '', 1)
+        for name in BugSystem.objects.filter(
+            name__in=[f'GitHub Issues for {name}' for name in names]
+        ).values_list('name', flat=True)
+    )
+
+    return [
+        repo_object for repo_object in repo_objects
+        if repo_object.full_name not in mapped or _changed_since(repo_object, watermark)
+    ]
+
+
+def fetch_tag_names(rpc, full_name):
+    """
+        Returns the names of all tags in a repository. Every page is
+        requested conditionally and pages which didn't change since the
+        last time are taken from the cache. GitHub doesn't count
+        responses with 304 Not Modified against the rate limit!
+    """
+    names = []
+    page = 1
+
+    while True:
+        cache_key = f"tags-for-{full_name}-page-{page}"
+        cached = cache.get(cache_key)
+
+        headers = {}
+        if cached:
+            headers['If-None-Match'] = cached['etag']
+
+        response_headers, data = rpc.requester.requestJsonAndCheck(
+            "GET",
+            f"/repos/{full_name}/tags",
+            parameters={'per_page': TAGS_PER_PAGE, 'page': page},
+            headers=headers,
+        )
+
+        # body is empty only for 304 Not Modified
+        if data is None and cached:
+            page_names = cached['names']
+        else:
+            page_names = [tag['name'] for tag in data or []]
+            if response_headers.get('etag'):
+                cache.set(
+                    cache_key,
+                    {'etag': response_headers['etag'], 'names': page_names},
+                    TAGS_CACHE_TIMEOUT,
+                )
+
+        names.extend(page_names)
+        if len(page_names) < TAGS_PER_PAGE:
+            return names
+
+        page += 1
+
+
+def import_tags(product, names):
+    """
+        Create Version records for tags which don't exist yet.
+        Returns a list of (record, status) for the new records!
+    """
+    existing = set(
+        Version.objects.filter(product=product, value__in=names).values_list('value', flat=True)
+    )
+    new_versions = [
+        Version(product=product, value=name)
+        for name in dict.fromkeys(names)
+        if name not in existing
+    ]
+
+    # in case a webhook created some of them in the mean time
+    Version.objects.bulk_create(new_versions, ignore_conflicts=True)
+
+    return [(version, RECORD_CREATED) for version in new_versions]
+
+
+class ResyncStopped(Exception):
+    """
+        Raised when the rate limit is almost used up during a resync which
+        can't be deferred b/c there is no worker to continue it later!
+    """
+    def __init__(self, installation_id, reset):
+        super().__init__(
+            f"Rate limit for GitHub App {installation_id} is reserved until {reset}. "
+            "Tags were not imported for all repositories, please resync again later"
+        )
+
+
+def _resync_tags(app_inst, products):
+    """
+        Import existing tags for the given products. When the rate limit
+        is almost used up background work raises RateLimitDeferred and the
+        job continues from its last checkpoint. Otherwise ResyncStopped
+        is raised. In both cases the watermark doesn't move forward,
+        otherwise the remaining tags would never be imported!
+    """
+    rpc = github_rpc_from_inst(app_inst)
+    versions = []
+
+    for product, _db_status in products:
+        current = ratelimit.status(app_inst.installation)
+        if current and current['remaining'] < ratelimit.reserve():
+            if ratelimit.is_background():
+                raise ratelimit.RateLimitDeferred(app_inst.installation, current['reset'])
+            raise ResyncStopped(app_inst.installation, current['reset'])
+
+        try:
+            names = call_github(app_inst, fetch_tag_names, rpc, product.name)
+        except github.UnknownObjectException:
+            continue
+
+        versions.extend(import_tags(product, names))
+
+    return versions
+
+
+def _resync_page(app_inst, repo_objects, watermark):
+    """
+        Import a single page of repositories and their tags.
+        Returns a report for this page only!
+    """
+    if watermark:
+        needing_sync = _repos_needing_sync(repo_objects, watermark)
+    else:
+        needing_sync = repo_objects
+
+    with transaction.atomic():
+        products, bug_systems = import_repositories(needing_sync)
+    versions = _resync_tags(app_inst, products)
+
+    # forks and repositories which didn't change since the last resync
+    imported = {product.name for product, _db_status in products}
+    products.extend(
+        (repo_object.full_name, RECORD_SKIPPED)
+        for repo_object in repo_objects
+        if repo_object.full_name not in imported
+    )
+
+    return resync_report(product=products, bug_system=bug_systems, version=versions)
+
+
+def _resync(job):
+    """
+        Import repositories of this installation, together with their
+        existing tags, into the current tenant. Unless ``job.full`` only
+        repositories which changed since the last successful resync
+        are processed!
+
+        Repositories are fetched and imported one page at a time so that
+        memory usage doesn't depend on their number. Progress is saved
+        after every page and a job which was interrupted continues from
+        the last saved page. At worst the page which was being imported
+        is imported again!
+    """
+    app_inst = job.installation
+    started_on = job.started_on or timezone.now()
+    watermark = None if job.full else app_inst.last_synced_on
+
+    repositories = github_installation_from_inst(app_inst).get_repos()
+
+    while True:
+        repo_objects = call_github(app_inst, repositories.get_page, job.page)
+        if repo_objects:
+            page_report = _resync_page(app_inst, repo_objects, watermark)
+            merge_counters(job.counters, resync_counters(page_report))
+            merge_reports(job.report, page_report)
+
+        job.page += 1
+        job.checkpoint_on = timezone.now()
+        job.save(update_fields=['page', 'report', 'counters', 'checkpoint_on'])
+
+        if len(repo_objects) < REPOS_PER_PAGE:
+            break
+
+    app_inst.last_synced_on = started_on
+    AppInstallation.objects.filter(pk=app_inst.pk).update(last_synced_on=started_on)
+
+
+def _report_name(record):
+    if isinstance(record, Version):
+        return f"{record.product.name}@{record.value}"
+
+    return str(record)
+
+
+def resync_report(**records):
+    """
+        Returns the names of created/existing/skipped records for each record type
+    """
+    report = {}
+
+    for record_type, results in records.items():
+        report[record_type] = {status: [] for status in RECORD_STATUSES.values()}
+        for record, db_status in results:
+            report[record_type][RECORD_STATUSES[db_status]].append(_report_name(record))
+
+    return report
+
+
+def merge_reports(report, other):
+    """
+        Add the record names from ``other`` into ``report``. At most
+        KIWI_GITHUB_APP_RESYNC_REPORT_LIMIT names are kept for each
+        record type & status so that the size of a job doesn't depend
+        on the number of repositories, see resync_counters()!
+    """
+    limit = getattr(settings, 'KIWI_GITHUB_APP_RESYNC_REPORT_LIMIT', 1000)
+
+    for record_type, statuses in other.items():
+        for status, names in statuses.items():
+            kept = report.setdefault(record_type, {}).setdefault(status, [])
+            kept.extend(names[:max(limit - len(kept), 0)])
+
+    return report
+
+
+def resync_counters(report):
+    """
+        Returns the number of created/existing/skipped records for each record type
+    """
+    return {
+        record_type: {status: len(names) for status, names in statuses.items()}
+        for record_type, statuses in report.items()
+    }
+
+
+def merge_counters(counters, other):
+    """
+        Add the numbers from ``other`` into ``counters``
+    """
+    for record_type, statuses in other.items():
+        for status, count in statuses.items():
+            current = counters.setdefault(record_type, {})
+            current[status] = current.get(status, 0) + count
+
+    return counters
+
+
+def resync(request, app_inst, full=False):
+    """
+        Used when manually trigerring a resync. Product, BugSystem and
+        Version records are synced! The outcome is stored in a ResyncJob
+        and only a summary is shown to the user.
+    """
+    job = ResyncJob.objects.create(
+        installation=app_inst,
+        tenant_pk=app_inst.tenant_pk,
+        requested_by=request.user.pk,
+        full=full,
+        state=ResyncJob.STATE_RUNNING,
+        started_on=timezone.now(),
+        checkpoint_on=timezone.now(),
+    )
+    run_resync_job(job)
+    resync_summary(request, job)
+
+    return job
+
+
+def enqueue_resync(request, app_inst, full=False):
+    """
+        Schedule a resync which will be executed by the
+        process_github_resync_jobs command. If there is already one
+        waiting for this installation then return it instead!
+    """
+    job = ResyncJob.objects.filter(
+        installation=app_inst,
+        tenant_pk=app_inst.tenant_pk,
+        state=ResyncJob.STATE_PENDING,
+    ).first()
+
+    if not job:
+        job = ResyncJob.objects.create(
+            installation=app_inst,
+            tenant_pk=app_inst.tenant_pk,
+            requested_by=request.user.pk,
+            full=full,
+        )
+    elif full and not job.full:
+        job.full = True
+        ResyncJob.objects.filter(pk=job.pk).update(full=True)
+
+    return job
+
+
+def run_resync_job(job):
+    """
+        Executes a ResyncJob which has already been claimed by a worker.
+        When the rate limit runs out the job is scheduled to continue
+        from its last checkpoint after the rate limit is reset. Unless
+        executed in the background the job stops early instead and
+        records why in ``job.error``!
+    """
+    try:
+        tenant = Tenant.objects.get(pk=job.tenant_pk)
+        with tenant_context(tenant):
+            _resync(job)
+    except ratelimit.RateLimitDeferred as err:
+        job.state = ResyncJob.STATE_PENDING
+        job.not_before = err.not_before
+    except ResyncStopped as err:
+        job.state = ResyncJob.STATE_DONE
+        job.error = str(err)
+        job.finished_on = timezone.now()
+    except Exception as err:
+        job.state = ResyncJob.STATE_FAILED
+        job.error = str(err)
+        job.finished_on = timezone.now()
+        job.save()
+        raise
+    else:
+        job.state = ResyncJob.STATE_DONE
+        job.finished_on = timezone.now()
+
+    job.save()
@@ -1,4 +1,4 @@
-# Copyright (c) 2019-2024 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2019-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
@@ -6,14 +6,23 @@
 # pylint: disable=unused-argument
 
 import json
+from datetime import timedelta
+from http import HTTPStatus
 
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import Q
 from django.http import HttpResponse
 from django.http import HttpResponseForbidden
 from django.http import HttpResponseRedirect
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.shortcuts import render
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.csrf import csrf_exempt
@@ -22,7 +31,9 @@ from django.views.generic.base import View
 from tcms.utils import github
 
 from tcms_github_app.models import AppInstallation
+from tcms_github_app.models import ResyncJob
 from tcms_github_app.models import WebhookPayload
+from tcms_github_app import ratelimit
 from tcms_github_app import utils
 
 
@@ -118,10 +129,47 @@ class Resync(View):  # pylint: disable=missing-permission-required
 
         # user .first() b/c the result is a query set
         installation = installations.first()
+
+        if getattr(settings, 'KIWI_GITHUB_APP_ASYNC_RESYNC', False):
+            job = utils.enqueue_resync(request, installation)
+            return HttpResponseRedirect(reverse('github_app_resync_job', args=[job.pk]))
+
         utils.resync(request, installation)
         return HttpResponseRedirect('/')
 
 
+@method_decorator(login_required, name='dispatch')
+class ResyncJobView(View):  # pylint: disable=missing-permission-required
+    """
+        Shows the progress of a resync executed in the background.
+        Anyone who can access the current tenant can see it!
+    """
+    template_name = 'tcms_github_app/resync_job.html'
+
+    def get(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(ResyncJob, pk=pk, tenant_pk=request.tenant.pk)
+        return render(request, self.template_name, {'job': job})
+
+
+@method_decorator(login_required, name='dispatch')
+class ResyncJobStatus(View):  # pylint: disable=missing-permission-required
+    """
+        JSON status of a resync executed in the background
+    """
+    def get(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(ResyncJob, pk=pk, tenant_pk=request.tenant.pk)
+
+        return JsonResponse({
+            'id': job.pk,
+            'state': job.state,
+            'counters': job.counters,
+            'error': job.error,
+            'created_on': job.created_on,
+            'started_on': job.started_on,
+            'finished_on': job.finished_on,
+        })
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class WebHook(View):  # pylint: disable=missing-permission-required
     """
@@ -134,12 +182,48 @@ class WebHook(View):  # pylint: disable=missing-permission-required
     def handle_payload(payload):
         if payload.event == "repository" and payload.action == "created":
             utils.create_product_from_repository(payload)
+        elif payload.event == "repository" and payload.action in utils.REPOSITORY_CHANGED_ACTIONS:
+            utils.forget_repository(payload)
         elif payload.event == "installation_repositories":
             utils.create_product_from_installation_repositories(payload)
         elif payload.event == "installation" and payload.action == "created":
             utils.create_installation(payload)
         elif payload.event == "create" and payload.payload.get('ref_type') == "tag":
             utils.create_version_from_tag(payload)
+        elif payload.event == "issues" and payload.action in utils.MIRRORED_ISSUE_ACTIONS:
+            utils.mirror_issue(payload)
+
+    @classmethod
+    def process_payload(cls, wh_payload):
+        """
+            Dispatch a stored payload and record the outcome on it.
+            Exceptions are re-raised after the payload is marked as failed!
+            Payloads deferred b/c of the rate limit stay pending, but only
+            when processed by a worker. Otherwise nobody would pick them up
+            and GitHub must redeliver them!
+        """
+        try:
+            cls.handle_payload(wh_payload)
+        except ratelimit.RateLimitDeferred as err:
+            if not ratelimit.is_background():
+                cls.mark_failed(wh_payload)
+                raise
+            wh_payload.not_before = err.not_before
+            wh_payload.save(update_fields=['not_before'])
+            return
+        except Exception:
+            cls.mark_failed(wh_payload)
+            raise
+
+        wh_payload.status = WebhookPayload.STATUS_DONE
+        wh_payload.processed_on = timezone.now()
+        wh_payload.save(update_fields=['status', 'processed_on'])
+
+    @staticmethod
+    def mark_failed(wh_payload):
+        wh_payload.status = WebhookPayload.STATUS_FAILED
+        wh_payload.processed_on = timezone.now()
+        wh_payload.save(update_fields=['status', 'processed_on'])
 
     def post(self, request, *args, **kwargs):
         """
@@ -163,14 +247,80 @@ class WebHook(View):  # pylint: disable=missing-permission-required
 
         # GitHub ID will be matched again UserSocialAuth.uid
         sender = payload['sender']['id']
+        # unique for each delivery, stays the same when GitHub redelivers
+        delivery = request.headers.get('X-GitHub-Delivery', None)
 
-        wh_payload = WebhookPayload.objects.create(
-            event=event,
-            action=payload.get('action'),
-            sender=sender,
-            payload=payload,
-        )
+        wh_payload = None
+        if delivery:
+            wh_payload = WebhookPayload.objects.filter(delivery=delivery).first()
+            if wh_payload and not self.should_retry(wh_payload):
+                return self.stored_outcome(wh_payload)
+
+        if not wh_payload:
+            try:
+                with transaction.atomic():
+                    wh_payload = WebhookPayload.objects.create(
+                        event=event,
+                        action=payload.get('action'),
+                        sender=sender,
+                        payload=payload,
+                        status=WebhookPayload.STATUS_PENDING,
+                        delivery=delivery,
+                    )
+            except IntegrityError:
+                # the same delivery is being handled by another request
+                return self.stored_outcome(
+                    WebhookPayload.objects.get(delivery=delivery))
+
+        # ack-then-process, see the process_github_webhooks command
+        if getattr(settings, 'KIWI_GITHUB_APP_ASYNC_WEBHOOKS', False):
+            return self.stored_outcome(wh_payload)
+
+        self.process_payload(wh_payload)
+
+        return self.stored_outcome(wh_payload)
+
+    @staticmethod
+    def should_retry(wh_payload):
+        """
+            Redeliveries of a failed payload are processed again,
+            everything else is a duplicate! Unless there are workers,
+            payloads which are still pending after
+            KIWI_GITHUB_APP_WEBHOOK_TIMEOUT seconds are processed again
+            too. The request handling them must have been killed, e.g.
+            b/c it took too long!
+        """
+        if wh_payload.status == WebhookPayload.STATUS_DONE:
+            return False
+
+        now = timezone.now()
+        reclaimable = Q(status=WebhookPayload.STATUS_FAILED)
+        if not getattr(settings, 'KIWI_GITHUB_APP_ASYNC_WEBHOOKS', False):
+            stale_before = now - timedelta(
+                seconds=getattr(settings, 'KIWI_GITHUB_APP_WEBHOOK_TIMEOUT', 300)
+            )
+            reclaimable |= Q(
+                status=WebhookPayload.STATUS_PENDING,
+                processed_on__isnull=True,
+                received_on__lt=stale_before,
+            )
+
+        # only one of several concurrent redeliveries wins,
+        # received_on starts the timeout again
+        wh_payload.status = WebhookPayload.STATUS_PENDING
+        return WebhookPayload.objects.filter(
+            reclaimable,
+            pk=wh_payload.pk,
+        ).update(status=WebhookPayload.STATUS_PENDING, received_on=now) == 1
+
+    @staticmethod
+    def stored_outcome(wh_payload):
+        if wh_payload.status == WebhookPayload.STATUS_DONE:
+            return HttpResponse('ok', content_type='text/plain')
 
-        self.handle_payload(wh_payload)
+        if wh_payload.status == WebhookPayload.STATUS_PENDING:
+            return HttpResponse('accepted', content_type='text/plain',
+                                status=HTTPStatus.ACCEPTED)
 
-        return HttpResponse('ok', content_type='text/plain')
+        return HttpResponse('failed', content_type='text/plain',
+                            status=HTTPStatus.INTERNAL_SERVER_ERROR)
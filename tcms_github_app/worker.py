@@ -0,0 +1,182 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from tcms_github_app import ratelimit
+from tcms_github_app import utils
+from tcms_github_app.models import AppInstallation
+from tcms_github_app.models import ResyncJob
+from tcms_github_app.models import WebhookPayload
+from tcms_github_app.views import WebHook
+
+
+def process_next_payload():
+    """
+        Claim the oldest pending WebhookPayload and dispatch it.
+        Rows locked by other workers are skipped so any number of
+        workers, in any number of processes, can drain the queue.
+
+        Returns False when there is nothing left to process!
+    """
+    with transaction.atomic():
+        wh_payload = WebhookPayload.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            Q(not_before__isnull=True) | Q(not_before__lte=timezone.now()),
+            status=WebhookPayload.STATUS_PENDING,
+        ).order_by('pk').first()
+
+        if wh_payload is None:
+            return False
+
+        try:
+            # a database error inside the handler rolls back only this
+            # savepoint, otherwise the failure couldn't be recorded below
+            with transaction.atomic(), ratelimit.background():
+                WebHook.process_payload(wh_payload)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # keep going with the rest of the queue
+            traceback.print_exc()
+            WebHook.mark_failed(wh_payload)
+
+    return True
+
+
+def process_next_resync_job():
+    """
+        Claim the oldest pending ResyncJob and execute it. Unlike webhooks
+        the job is marked as running in a short transaction and executed
+        outside of it b/c it may take a long time and we want its progress
+        to be visible!
+
+        Running jobs which didn't save any progress for a while are
+        considered interrupted, e.g. the worker was killed, and are
+        claimed again. They continue from their last checkpoint!
+
+        Returns False when there is nothing left to process!
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(
+        seconds=getattr(settings, 'KIWI_GITHUB_APP_RESYNC_TIMEOUT', 1800)
+    )
+
+    pending = Q(state=ResyncJob.STATE_PENDING, not_before__isnull=True)
+    deferred = Q(state=ResyncJob.STATE_PENDING, not_before__lte=now)
+    abandoned = Q(state=ResyncJob.STATE_RUNNING, checkpoint_on__lt=stale_before)
+
+    with transaction.atomic():
+        job = ResyncJob.objects.select_for_update(
+            skip_locked=True
+        ).filter(pending | deferred | abandoned).order_by('pk').first()
+
+        if job is None:
+            return False
+
+        job.state = ResyncJob.STATE_RUNNING
+        if not job.started_on:
+            job.started_on = now
+        job.checkpoint_on = now
+        job.save(update_fields=['state', 'started_on', 'checkpoint_on'])
+
+    try:
+        with ratelimit.background():
+            utils.run_resync_job(job)
+    except Exception:  # pylint: disable=broad-exception-caught
+        # already marked as failed, keep going with the rest of the queue
+        traceback.print_exc()
+
+    return True
+
+
+def _remaining_api_calls(rpc):
+    remaining, _limit = rpc.requester.rate_limiting
+
+    # unknown until the first request was made
+    if remaining < 0:
+        rpc.get_rate_limit()
+        remaining, _limit = rpc.requester.rate_limiting
+
+    return remaining
+
+
+def resync_tenant(tenant_pk, installation_pks, full=False):
+    """
+        Resync all installations configured for the same tenant, one
+        after another. Used by the resync_github_installations command.
+
+        Returns a list of dicts with timing information and the number
+        of GitHub API calls made for each installation!
+    """
+    results = []
+
+    for app_inst in AppInstallation.objects.filter(
+            pk__in=installation_pks).order_by('pk'):
+        rpc = utils.github_rpc_from_inst(app_inst)
+        remaining_before = _remaining_api_calls(rpc)
+        started_at = time.monotonic()
+
+        job = ResyncJob.objects.create(
+            installation=app_inst,
+            tenant_pk=tenant_pk,
+            full=full,
+            state=ResyncJob.STATE_RUNNING,
+            started_on=timezone.now(),
+            checkpoint_on=timezone.now(),
+        )
+
+        try:
+            if getattr(settings, 'KIWI_GITHUB_APP_ASYNC_RESYNC', False):
+                # deferred jobs are continued by process_github_resync_jobs
+                with ratelimit.background():
+                    utils.run_resync_job(job)
+            else:
+                utils.run_resync_job(job)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # already marked as failed, keep going with the rest
+            traceback.print_exc()
+
+        remaining_after, _limit = rpc.requester.rate_limiting
+        api_calls = remaining_before - remaining_after
+        results.append({
+            'installation': app_inst.installation,
+            'tenant_pk': tenant_pk,
+            'job': job.pk,
+            'state': job.state,
+            'seconds': time.monotonic() - started_at,
+            # negative when the rate limit was reset in the mean time
+            'api_calls': api_calls if api_calls >= 0 else None,
+            'counters': job.counters,
+            'error': job.error,
+        })
+
+    return results
+
+
+def run(stop_event, process, sleep=1.0, once=False):
+    """
+        Worker loop, executed in a separate thread by the
+        process_github_* commands.
+    """
+    try:
+        while not stop_event.is_set():
+            if process():
+                continue
+
+            if once:
+                break
+
+            stop_event.wait(sleep)
+    finally:
+        # each thread has its own DB connection
+        connection.close()